@@ -1,4 +1,5 @@
 import sys
+from util import *
 
 def parse(line):
     line = line.strip()
@@ -12,11 +13,10 @@ def wrap(x):
     else:
         return x
 
+@Memoize
 def ev(e):
     if e.isdigit():
         return int(e)
-    if e in cache:
-        return cache[e]
     exp = wires[e]
     if len(exp) == 1:
         res = ev(exp[0])
@@ -38,9 +38,7 @@ def ev(e):
         elif op == "LSHIFT":
             res = x << y
 
-    cache[e] = res
     return res
 
-cache = {}
 wires = {assigned:exp for assigned, exp in map(parse, sys.stdin)}
 print(ev("a"))
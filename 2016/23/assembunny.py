@@ -0,0 +1,158 @@
+import sys
+
+# Assembunny, the language of 2016 days 12, 23 and 25
+
+regs = "abcd"
+
+def parse(f):
+    return [line.split() for line in f if line.strip()]
+
+def define(src, name, **env):
+    exec(src, env)
+    return env[name]
+
+# Loops that only count registers up and down run as arithmetic instead.
+#
+# Below, x, y and z stand for distinct registers, $n for a register or a
+# number, and jump offsets for themselves. The arithmetic only replaces the
+# loop when its guard holds, as when the counters start positive, else the
+# loop runs an instruction at a time.
+
+# x += y
+add_loops = [
+    [("inc", "x"), ("dec", "y"), ("jnz", "y", "-2")],
+    [("dec", "y"), ("inc", "x"), ("jnz", "y", "-2")],
+]
+
+add_body = """\
+{x} += {y}
+{y} = 0"""
+
+# x += n * z
+mul_loops = [
+    [("cpy", "$n", "y"), ("inc", "x"), ("dec", "y"), ("jnz", "y", "-2"), ("dec", "z"), ("jnz", "z", "-5")],
+    [("cpy", "$n", "y"), ("dec", "y"), ("inc", "x"), ("jnz", "y", "-2"), ("dec", "z"), ("jnz", "z", "-5")],
+]
+
+mul_body = """\
+{x} += {n} * {z}
+{y} = 0
+{z} = 0"""
+
+# (patterns, guard, body, check of the bound names)
+patterns = [
+    (add_loops, "{y} > 0", add_body, lambda env: True),
+    (mul_loops, "{n} > 0 and {z} > 0", mul_body, lambda env: env["$n"] not in (env["x"], env["y"], env["z"])),
+]
+
+longest = max(len(p) for ps, _, _, _ in patterns for p in ps)
+
+def unify(env, sym, x):
+    if sym.lstrip("-").isdigit():
+        return x == sym
+    elif sym in env:
+        return env[sym] == x
+    elif sym[0] != "$":
+        if x not in regs or x in [v for k, v in env.items() if k[0] != "$"]:
+            return False
+    env[sym] = x
+    return True
+
+# what x, y, z and $n are in the instructions at start, or None if they
+# aren't the loop
+def match(pattern, prog, start):
+    if start + len(pattern) > len(prog):
+        return None
+    env = {}
+    for p, instr in zip(pattern, prog[start:]):
+        if p[0] != instr[0] or len(p) != len(instr):
+            return None
+        if not all(unify(env, sym, x) for sym, x in zip(p[1:], instr[1:])):
+            return None
+    return env
+
+class Assembunny:
+    def __init__(self, prog, reg=None):
+        # copied, as tgl changes it
+        self.prog = [list(instr) for instr in prog]
+        self.reg = reg if reg is not None else [0] * 4
+        self.ip = 0
+        self.outputs = []
+        self.code = [None] * len(self.prog)
+        self.analyze(0, len(self.prog))
+
+    def value(self, x):
+        return "r[%s]" % regs.index(x) if x in regs else str(int(x))
+
+    # compile the instruction at ip into a function of the registers, which
+    # executes it and returns the next ip. instructions made invalid by tgl
+    # are skipped
+    def decode(self, ip):
+        instr = self.prog[ip]
+        o, args = instr[0], instr[1:]
+        v = self.value
+        nxt = ip + 1
+        body = None
+        env = {}
+        if o == "cpy" and len(args) == 2 and args[1] in regs:
+            body = "r[%s] = %s\n    return %s" % (regs.index(args[1]), v(args[0]), nxt)
+        elif o == "inc" and len(args) == 1 and args[0] in regs:
+            body = "r[%s] += 1\n    return %s" % (regs.index(args[0]), nxt)
+        elif o == "dec" and len(args) == 1 and args[0] in regs:
+            body = "r[%s] -= 1\n    return %s" % (regs.index(args[0]), nxt)
+        elif o == "jnz" and len(args) == 2:
+            body = "return %s + %s if %s else %s" % (ip, v(args[1]), v(args[0]), nxt)
+        elif o == "tgl" and len(args) == 1:
+            body = "toggle(%s + %s)\n    return %s" % (ip, v(args[0]), nxt)
+            env["toggle"] = self.toggle
+        elif o == "out" and len(args) == 1:
+            body = "out.append(%s)\n    return %s" % (v(args[0]), nxt)
+            env["out"] = self.outputs
+        if body is None:
+            body = "return %s" % nxt
+        return define("def f(r):\n    %s\n" % body, "f", **env)
+
+    # (re)decode the instructions from start to end, and any loops starting
+    # there
+    def analyze(self, start, end):
+        for ip in range(start, end):
+            self.code[ip] = plain = self.decode(ip)
+            for ps, guard, body, check in patterns:
+                for p in ps:
+                    env = match(p, self.prog, ip)
+                    if env is not None and check(env):
+                        names = {k.lstrip("$"): self.value(x) for k, x in env.items()}
+                        src = "def f(r):\n    if %s:\n%s\n        return %s\n    return plain(r)\n" % (
+                            guard.format(**names), "\n".join("        " + l for l in body.format(**names).split("\n")), ip + len(p))
+                        self.code[ip] = define(src, "f", plain=plain)
+
+    # tgl, flip the instruction at ip, and analyze it and any loops that
+    # could cover it again
+    def toggle(self, ip):
+        if not 0 <= ip < len(self.prog):
+            return
+        instr = self.prog[ip]
+        if len(instr) == 2:
+            instr[0] = "dec" if instr[0] == "inc" else "inc"
+        else:
+            instr[0] = "cpy" if instr[0] == "jnz" else "jnz"
+        self.analyze(max(0, ip - longest + 1), ip + 1)
+
+    # run until the next output, returns it, or None if the program halts
+    def run(self):
+        code = self.code
+        r = self.reg
+        out = self.outputs
+        ip = self.ip
+        n = len(code)
+        try:
+            while 0 <= ip < n and not out:
+                ip = code[ip](r)
+        finally:
+            self.ip = ip
+        return out.pop(0) if out else None
+
+if __name__ == "__main__":
+    ab = Assembunny(parse(sys.stdin))
+    ab.run()
+    print(ab.reg)
@@ -1,58 +1,53 @@
 import sys
 from itertools import count
+from multiprocessing import Pool, cpu_count
+from assembunny import *
 
-def parse(line):
-    return line.split()
+# python3 foo.py [processes [stop]] < input.txt
+#
+# processes 0 uses all CPUs, stop bounds the search, which prints None if
+# nothing below it works
 
-ins = map(parse, sys.stdin)
+# does a produce the clock signal 0, 1, 0, 1, ... forever? gives up as soon
+# as an output is off. the signal is known to go on forever once the VM is
+# in the same state (ip and registers) after two outputs an even number of
+# outputs apart. gives up after limit outputs without that happening
+def is_clock(prog, a, limit=10000):
+    ab = Assembunny(prog, [a, 0, 0, 0])
+    # state after an output -> number of outputs at the time
+    seen = {}
+    for n in range(limit):
+        x = ab.run()
+        if x != n % 2:
+            return False
+        state = (ab.ip, tuple(ab.reg))
+        if state in seen and (n - seen[state]) % 2 == 0:
+            return True
+        seen.setdefault(state, n)
+    return False
 
-def v(x, reg):
-    if x in reg:
-        return reg[x]
-    else:
-        return int(x)
+def search(args):
+    prog, candidates = args
+    return [a for a in candidates if is_clock(prog, a)]
 
-def run(a, ml):
-    reg = {
-            "a": a,
-            "b": 0,
-            "c": 0,
-            "d": 0
-            }
-    out = []
-    i = 0
-    while i >= 0 and i < len(ins) and len(out) < ml:
-        if i == 3 and False:
-            print("hack!")
-            reg["d"] = reg["c"] * reg["b"] - 1
-            reg["c"] = 1
-            reg["b"] = 1
+# check candidates from start up to stop, or forever without stop, in
+# chunks spread over a process pool, a batch of chunks at a time. returns
+# the lowest a that produces the clock signal, or None if there is none
+def solve(prog, start=0, stop=None, processes=None, chunk=64):
+    processes = processes or cpu_count()
+    batch = chunk * processes * 4
+    starts = count(start, batch) if stop is None else range(start, stop, batch)
+    with Pool(processes) as pool:
+        for i in starts:
+            end = i + batch if stop is None else min(i + batch, stop)
+            chunks = [(prog, range(j, min(j + chunk, end))) for j in range(i, end, chunk)]
+            for found in pool.imap(search, chunks):
+                if found:
+                    return found[0]
+    return None
 
-        ii = ins[i]
-        o = ii[0]
-        if o == "cpy":
-            x = v(ii[1], reg)
-            y = ii[2]
-            reg[y] = x
-        elif o == "inc":
-            reg[ii[1]] += 1
-        elif o == "dec":
-            reg[ii[1]] -= 1
-        elif o == "jnz":
-            x = v(ii[1], reg)
-            y = v(ii[2], reg)
-            if x != 0:
-                i += y - 1
-        elif o == "out":
-            x = v(ii[1], reg)
-            out.append(x)
-
-        i += 1
-    return out
-
-ml = 10 # reasonable match length, if it's a 0, 1 series for ml outputs, we're happy
-for i in count():
-    out = run(i, ml)
-    if out == [0, 1] * (ml // 2):
-        print(i)
-        break
+if __name__ == "__main__":
+    prog = parse(sys.stdin)
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1] != "0" else None
+    stop = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(solve(prog, stop=stop, processes=processes))
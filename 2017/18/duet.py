@@ -0,0 +1,101 @@
+import sys
+from collections import deque
+
+# Duet, as in part 2: snd sends to another program, rcv receives, and blocks
+# when there's nothing to receive
+
+def parse(f):
+    return [line.split() for line in f if line.strip()]
+
+def define(src, name, **env):
+    exec(src, env)
+    return env[name]
+
+def reg(x):
+    return ord(x) - ord("a")
+
+def value(x):
+    return "r[%s]" % reg(x) if x.isalpha() else str(int(x))
+
+class Program:
+    def __init__(self, prog, pid, inq, outq):
+        self.reg = [0] * 26
+        self.reg[reg("p")] = pid
+        self.ip = 0
+        self.inq = inq
+        self.outq = outq
+        # values sent
+        self.sent = 0
+        self.code = [self.decode(ip, *instr) for ip, instr in enumerate(prog)]
+
+    def send(self, x):
+        self.outq.append(x)
+        self.sent += 1
+
+    # compile the instruction at ip into a function of the registers, which
+    # executes it and returns the next ip. rcv raises IndexError when the
+    # queue is empty
+    def decode(self, ip, o, x, y=None):
+        nxt = ip + 1
+        if o == "set":
+            body = "r[%s] = %s\n    return %s" % (reg(x), value(y), nxt)
+        elif o == "add":
+            body = "r[%s] += %s\n    return %s" % (reg(x), value(y), nxt)
+        elif o == "mul":
+            body = "r[%s] *= %s\n    return %s" % (reg(x), value(y), nxt)
+        elif o == "mod":
+            body = "r[%s] %%= %s\n    return %s" % (reg(x), value(y), nxt)
+        elif o == "snd":
+            body = "send(%s)\n    return %s" % (value(x), nxt)
+        elif o == "rcv":
+            body = "r[%s] = receive()\n    return %s" % (reg(x), nxt)
+        elif o == "jgz":
+            body = "return %s + %s if %s > 0 else %s" % (ip, value(y), value(x), nxt)
+        else:
+            assert False, o
+        return define("def f(r):\n    %s\n" % body, "f", send=self.send, receive=self.inq.popleft)
+
+    def halted(self):
+        return not 0 <= self.ip < len(self.code)
+
+    # run until blocked on rcv, or halted. returns the number of
+    # instructions executed
+    def run(self):
+        code = self.code
+        r = self.reg
+        ip = self.ip
+        n = len(code)
+        steps = 0
+        try:
+            while 0 <= ip < n:
+                ip = code[ip](r)
+                steps += 1
+        except IndexError:
+            # blocked, rcv is run again when resumed
+            pass
+        finally:
+            self.ip = ip
+        return steps
+
+# n programs, with ids 0 to n - 1, where each sends to the next one, so
+# that with two they send to each other
+class Duet:
+    def __init__(self, prog, n=2):
+        queues = [deque() for _ in range(n)]
+        self.programs = [Program(prog, pid, queues[pid], queues[(pid + 1) % n]) for pid in range(n)]
+
+    # run the programs in turn, each until it blocks, until none of them can
+    # make progress, i.e. all have halted or are deadlocked
+    def run(self):
+        progress = True
+        while progress:
+            progress = False
+            for p in self.programs:
+                if p.run():
+                    progress = True
+        return self.programs
+
+if __name__ == "__main__":
+    duet = Duet(parse(sys.stdin))
+    duet.run()
+    print([p.sent for p in duet.programs])
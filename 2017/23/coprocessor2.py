@@ -1,22 +1,63 @@
-b = 105700
-c = b + 17000
-h = 0
+import sys
+from util import *
 
-while True:
-    d = 2
+# With a = 1, the program sets up b and c, and then counts in h the
+# composite numbers in b, b + step, ..., c, by trial division:
+#
+# b = 105700
+# c = b + 17000
+# h = 0
+#
+# while True:
+#     d = 2
+#
+#     while True:
+#         if b == d:
+#             break
+#
+#         if b % d == 0:
+#             h += 1
+#             break
+#
+#         d += 1
+#
+#     if b == c:
+#         break
+#     b += 17
+#
+# The constants are taken from the program: b and c are what the setup
+# before the outer loop leaves, step is the last sub from b.
 
-    while True:
-        if b == d:
-            break
+def parse(line):
+    return line.split()
 
-        if b % d == 0:
-            h += 1
-            break
+prog = list(map(parse, sys.stdin))
 
-        d += 1
+def value(reg, x):
+    return reg[x] if x.isalpha() else int(x)
 
-    if b == c:
-        break
-    b += 17
+# run the program until ip reaches end
+def run(prog, reg, end):
+    ip = 0
+    while ip != end:
+        o, x, y = prog[ip]
+        if o == "set":
+            reg[x] = value(reg, y)
+        elif o == "sub":
+            reg[x] -= value(reg, y)
+        elif o == "mul":
+            reg[x] *= value(reg, y)
+        elif o == "jnz" and value(reg, x) != 0:
+            ip += value(reg, y)
+            continue
+        ip += 1
+    return reg
 
-print(h)
+# the last instruction jumps back to the start of the outer loop
+last = len(prog) - 1
+loop = last + int(prog[last][2])
+
+reg = run(prog, dict.fromkeys("abcdefgh", 0) | {"a": 1}, loop)
+step = -int([y for o, x, y in prog if o == "sub" and x == "b"][-1])
+
+print(count_composites(range(reg["b"], reg["c"] + 1, step)))
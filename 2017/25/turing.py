@@ -1,23 +1,206 @@
-from collections import defaultdict
+import re
+import sys
+import time
 
-tape = defaultdict(int)
+# Turing machine from a blueprint, as in 2017 day 25
 
-states = dict()
-states['A'] = ((1, 1, 'B'), (0, 1, 'C'))
-states['B'] = ((0, -1, 'A'), (0, 1, 'D'))
-states['C'] = ((1, 1, 'D'), (1, 1, 'A'))
-states['D'] = ((1, -1, 'E'), (0, -1, 'D'))
-states['E'] = ((1, 1, 'F'), (1, -1, 'B'))
-states['F'] = ((1, 1, 'A'), (1, 1, 'E'))
+# returns (start state, steps, {state: ((write, move, next), ...)}), with a
+# rule for each current value
+def parse(text):
+    start = re.search(r"Begin in state (\w+)\.", text).group(1)
+    steps = int(re.search(r"after (\d+) steps", text).group(1))
+    rules = {}
+    for state, body in re.findall(r"In state (\w+):(.*?)(?=In state|\Z)", text, re.S):
+        cases = re.findall(r"current value is (\d+):\s*"
+                           r"- Write the value (\d+)\.\s*"
+                           r"- Move one slot to the (left|right)\.\s*"
+                           r"- Continue with state (\w+)\.", body)
+        rules[state] = tuple((int(w), 1 if m == "right" else -1, n) for _, w, m, n in sorted(cases))
+    return start, steps, rules
 
-pos = 0
-state = 'A'
-steps = 12368930
+class Machine:
+    def __init__(self, rules, start, size=1 << 16):
+        self.compile(rules, start)
 
-for step in range(steps):
-    write, move, next = states[state][tape[pos]]
-    tape[pos] = write
-    pos += move
-    state = next
+        self.tape = bytearray(size)
+        # tape[pos] is the current slot, which started out at tape[offset]
+        self.pos = self.offset = size // 2
+        # number of slots not 0, kept as the machine runs. with only 0 and 1
+        # on the tape, the diagnostic checksum
+        self.checksum = 0
 
-print(len(filter(lambda v: v == 1, tape.values())))
+    def compile(self, rules, start):
+        names = sorted(rules)
+        values = max(len(r) for r in rules.values())
+        # flat tables indexed by state * values + current value, with states
+        # numbered and premultiplied by values
+        self.values = values
+        self.write = [0] * (len(names) * values)
+        self.delta = [0] * (len(names) * values)
+        self.move = [0] * (len(names) * values)
+        self.next = [0] * (len(names) * values)
+        for s, name in enumerate(names):
+            for v, (w, m, n) in enumerate(rules[name]):
+                i = s * values + v
+                self.write[i] = w
+                self.delta[i] = w - v
+                self.move[i] = m
+                self.next[i] = names.index(n) * values
+        self.names = names
+        self.state = names.index(start) * values
+
+    # double the tape, adding half of the new space at each end
+    def grow(self):
+        n = len(self.tape) // 2
+        self.tape = bytearray(n) + self.tape + bytearray(n)
+        self.pos += n
+        self.offset += n
+
+    def run(self, steps):
+        write, delta, move, nxt = self.write, self.delta, self.move, self.next
+        s = self.state
+        pos = self.pos
+        checksum = self.checksum
+        while steps:
+            tape = self.tape
+            # the head moves one slot a step, so it can't go off the tape in
+            # fewer steps than this
+            k = min(steps, pos, len(tape) - 1 - pos)
+            if not k:
+                self.pos = pos
+                self.grow()
+                pos = self.pos
+                continue
+            for _ in range(k):
+                i = s + tape[pos]
+                tape[pos] = write[i]
+                checksum += delta[i]
+                pos += move[i]
+                s = nxt[i]
+            steps -= k
+        self.state = s
+        self.pos = pos
+        self.checksum = checksum
+        return checksum
+
+# far enough to be the ends of the tape
+inf = 1 << 62
+
+# take n slots off the run on top of a stack, dropping it once empty
+def take(stack, n):
+    top = stack[-1]
+    top[1] -= n
+    if not top[1]:
+        stack.pop()
+
+# put n slots of v on a stack, joining the run on top if it has the same value
+def put(stack, v, n):
+    top = stack[-1]
+    if top[0] == v:
+        top[1] += n
+    else:
+        stack.append([v, n])
+
+# Machine with the tape stored as runs of the same value, that skips over a
+# whole run in one step when a state keeps moving the same way over it, that
+# is, when its rule for the value of the run continues with the same state.
+# The number of steps taken this way depends on how often the machine
+# changes state or hits the end of a run, not on the number of steps, and
+# each only touches the runs next to the head. On blueprints that change
+# state all the time, like this day's input, it's still about 6 times slower
+# than Machine (15s against under 3s), as every step is a few list
+# operations rather than one bytearray index. It pays off for blueprints
+# that sweep back and forth over long uniform stretches of tape, see sweep
+# below.
+class RunMachine(Machine):
+    def __init__(self, rules, start):
+        self.compile(rules, start)
+
+        # the runs, [value, length], in two stacks with the nearest run to
+        # the head on top: left has the ones left of the head, right the
+        # ones from the head on, so the head is on the first slot of
+        # right[-1]. both end in a run of 0s as long as the rest of the tape
+        self.left = [[0, inf]]
+        self.right = [[0, inf]]
+        self.checksum = 0
+
+    def run(self, steps):
+        write, delta, move, nxt = self.write, self.delta, self.move, self.next
+        left, right = self.left, self.right
+        s = self.state
+        checksum = self.checksum
+        while steps:
+            v = right[-1][0]
+            i = s + v
+            if nxt[i] != s:
+                n = 1
+            elif move[i] == 1:
+                # sweep to the end of the run, or as far as there are steps
+                n = min(steps, right[-1][1])
+            else:
+                # the run goes on into left if its top has the same value
+                n = min(steps, 1 + left[-1][1] if left[-1][0] == v else 1)
+            checksum += delta[i] * n
+            if move[i] == 1:
+                take(right, n)
+                put(left, write[i], n)
+            else:
+                take(right, 1)
+                if n > 1:
+                    take(left, n - 1)
+                put(right, write[i], n)
+                # and the head onto the slot left of those
+                u = left[-1][0]
+                take(left, 1)
+                put(right, u, 1)
+            steps -= n
+            s = nxt[i]
+        self.state = s
+        self.checksum = checksum
+        return checksum
+
+# a blueprint that sweeps the head over all the 1s it has written, then adds
+# one at the end, alternating sides. steps grow with the square of the 1s,
+# runs only with the number of sweeps
+sweep = """Begin in state A.
+Perform a diagnostic checksum after %d steps.
+
+In state A:
+  If the current value is 0:
+    - Write the value 1.
+    - Move one slot to the left.
+    - Continue with state B.
+  If the current value is 1:
+    - Write the value 1.
+    - Move one slot to the right.
+    - Continue with state A.
+
+In state B:
+  If the current value is 0:
+    - Write the value 1.
+    - Move one slot to the right.
+    - Continue with state A.
+  If the current value is 1:
+    - Write the value 1.
+    - Move one slot to the left.
+    - Continue with state B.
+"""
+
+# python3 turing.py [runs] < input.txt
+#
+# runs uses RunMachine, only worth it for sweeping blueprints, see above.
+# python3 turing.py sweep [steps] compares both on sweep
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["sweep"]:
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10 ** 7
+        start, steps, rules = parse(sweep % n)
+        for machine in Machine, RunMachine:
+            t = time.perf_counter()
+            checksum = machine(rules, start).run(steps)
+            print(machine.__name__, checksum, "%.2fs" % (time.perf_counter() - t))
+        sys.exit()
+    start, steps, rules = parse(sys.stdin.read())
+    if sys.argv[1:] == ["runs"]:
+        print(RunMachine(rules, start).run(steps))
+    else:
+        print(Machine(rules, start).run(steps))
@@ -1,57 +1,9 @@
 import sys
 from collections import defaultdict
 import re
+from elfcode import *
 
-def addr(a, b, c, reg):
-    reg[c] = reg[a] + reg[b]
-
-def addi(a, b, c, reg):
-    reg[c] = reg[a] + b
-
-def mulr(a, b, c, reg):
-    reg[c] = reg[a] * reg[b]
-
-def muli(a, b, c, reg):
-    reg[c] = reg[a] * b
-
-def banr(a, b, c, reg):
-    reg[c] = reg[a] & reg[b]
-
-def bani(a, b, c, reg):
-    reg[c] = reg[a] & b
-
-def borr(a, b, c, reg):
-    reg[c] = reg[a] | reg[b]
-
-def bori(a, b, c, reg):
-    reg[c] = reg[a] | b
-
-def setr(a, b, c, reg):
-    reg[c] = reg[a]
-
-def seti(a, b, c, reg):
-    reg[c] = a
-
-def gtir(a, b, c, reg):
-    reg[c] = int(a > reg[b])
-
-def gtri(a, b, c, reg):
-    reg[c] = int(reg[a] > b)
-
-def gtrr(a, b, c, reg):
-    reg[c] = int(reg[a] > reg[b])
-
-def eqir(a, b, c, reg):
-    reg[c] = int(a == reg[b])
-
-def eqri(a, b, c, reg):
-    reg[c] = int(reg[a] == b)
-
-def eqrr(a, b, c, reg):
-    reg[c] = int(reg[a] == reg[b])
-
-all_ops = [addr, addi, mulr, muli, banr, bani, borr, bori, setr, seti, gtir, gtri,
-        gtrr, eqir, eqri, eqrr]
+all_ops = list(ops.values())
 
 def parse(lines):
     states = list()
@@ -75,11 +27,11 @@ def possible(samples):
     return m
 
 def uniq(pos):
-    opscodes = {k:v.pop() for k, v in pos.iteritems() if len(v) == 1}
+    opscodes = {k:v.pop() for k, v in pos.items() if len(v) == 1}
     q = [x for x in opscodes.values()]
     while q:
         item = q.pop()
-        for k, p in pos.iteritems():
+        for k, p in pos.items():
             if len(p) > 1:
                 p.discard(item)
                 if len(p) == 1:
@@ -102,13 +54,11 @@ pos = possible(samples)
 opcodes = uniq(pos)
 
 # parse program
-program = map(parse_op, program_input.strip().split("\n"))
+program = [(opcodes[o].__name__, a, b, c) for o, a, b, c in map(parse_op, program_input.strip().split("\n"))]
 
 # run program
-reg = [0, 0, 0, 0]
-for o, a, b, c in program:
-    op = opcodes[o]
-    op(a, b, c, reg)
+ec = Elfcode(program, reg=[0, 0, 0, 0])
+ec.run()
 
-print(reg[0])
+print(ec.reg[0])
 
@@ -1,56 +1,39 @@
 import sys
+from util import *
 
-def adjecent(m, x, y):
-    h = len(m)
-    w = len(m[0])
+OPEN, TREES, YARD = b".|#"
 
-    a = []
-    for xx in range(-1, 2):
-        for yy in range(-1, 2):
-            sx = x+xx
-            sy = y+yy
-            if xx == 0 and yy == 0:
-                pass
-            elif sx <0 or sy <0 or sx >= w or sy >= h:
-                pass
-            else:
-                a.append((sx, sy))
-    return a
+def tick(g):
+    cells = g.cells
+    new = bytearray(cells)
+    adj = g.adjacent
+    for i in g:
+        c = cells[i]
+        a = [cells[i + d] for d in adj]
+        if c == OPEN:
+            if a.count(TREES) >= 3:
+                new[i] = TREES
+        elif c == TREES:
+            if a.count(YARD) >= 3:
+                new[i] = YARD
+        elif YARD not in a or TREES not in a:
+            new[i] = OPEN
+    return new
 
-def count(m, a, target):
-    return len(filter(lambda (ax, ay): m[ay][ax] == target, a))
+g = Grid.from_text(sys.stdin)
 
-m = [l.strip() for l in sys.stdin]
+# the area settles into a cycle, find it and skip ahead
+def step(cells):
+    g.cells = bytearray(cells)
+    return bytes(tick(g))
 
-for tick in range(1, 500):
-    nm = []
-    yards = 0
-    threes = 0
-    for y, row in enumerate(m):
-        nr = ""
-        for x, c in enumerate(row):
-            a = adjecent(m, x, y)
-            if c == ".":
-                if count(m, a, "|") >= 3:
-                    nr += "|"
-                    threes += 1
-                else:
-                    nr += "."
-            elif c == "|":
-                if count(m, a, "#") >= 3:
-                    nr += "#"
-                    yards += 1
-                else:
-                    nr += "|"
-                    threes += 1
-            elif c == "#":
-                if count(m, a, "#") >= 1 and count(m, a, "|") >= 1:
-                    nr += "#"
-                    yards += 1
-                else:
-                    nr += "."
-        nm.append(nr)
-    m = nm
-    print("%s\t%s" % (tick, yards * threes))
+start = bytes(g.cells)
+lam, mu = brent(step, start)
+minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000000
+n = minutes if minutes < mu else mu + (minutes - mu) % lam
 
-# https://docs.google.com/spreadsheets/d/1QdiNDy6kkdnNmK4Q4qzP70aXHT-HNweKN_z7gH7g0bo/edit
+cells = start
+for _ in range(n):
+    cells = step(cells)
+g.cells = bytearray(cells)
+print(g.count(YARD) * g.count(TREES))
@@ -1,6 +1,5 @@
 import sys
-from collections import defaultdict
-from heapq import heappush, heappop
+from util import *
 
 depth = int(sys.argv[1])
 tx, ty = int(sys.argv[2]), int(sys.argv[3])
@@ -28,36 +27,33 @@ for y in range(maxy):
         el[(x, y)] = ero
         m[(x, y)] = types[ero % 3]
 
-costs = defaultdict(lambda: sys.maxint)
-h = [(0, 0, 0, "t")]
-
 allowed = {
         ".": ("t", "c"),
         "=": ("n", "c"),
         "|": ("t", "n")
         }
 
-while h:
-    c, x, y, tool = heappop(h)
-
-    if costs[(x, y, tool)] <= c:
-        # more expensive, no need to continue
-        continue
-
-    costs[(x, y, tool)] = c
-    if x == tx and y == ty and tool == "t":
-        # done
-        print(c)
-        break
+def neighbours(node):
+    x, y, tool = node
 
     # try moving
     for sx, sy in [(-1, 0), (0, -1), (1, 0), (0, 1)]:
         xx = x + sx
         yy = y + sy
-        if xx >= 0 and yy >= 0 and tool in allowed[m[(xx, yy)]]:
-            heappush(h, (c + 1, xx, yy, tool))
+        if (xx, yy) in m and tool in allowed[m[(xx, yy)]]:
+            yield (xx, yy, tool), 1
 
     # try switching tool
     for new_tool in allowed[m[(x, y)]]:
         if new_tool != tool:
-            heappush(h, (c + 7, x, y, new_tool))
+            yield (x, y, new_tool), 7
+
+# at least the steps left, and a switch if not holding the torch
+def heuristic(node):
+    x, y, tool = node
+    return manhattan((x, y), (tx, ty)) + (7 if tool != "t" else 0)
+
+target = (tx, ty, "t")
+s = Search(neighbours, heuristic)
+c, _ = s.run((0, 0, "t"), lambda n: n == target)
+print(c)
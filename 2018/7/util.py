@@ -0,0 +1,874 @@
+import atexit
+import shelve
+from array import array
+from collections import deque, defaultdict, OrderedDict
+from copy import deepcopy
+from heapq import heapify, heappush, heappop
+from re import findall
+from itertools import chain, count
+from functools import reduce
+from hashlib import sha256
+from math import gcd, prod, isqrt
+
+def flatmap(f, items):
+    return list(chain.from_iterable(map(f, items)))
+
+# get digit as position n from an int
+def digit(number, n):
+    return number // 10**n % 10
+
+# partition a list into chunks of lenght n
+def chunks(xs, n):
+    return [xs[i:i + n] for i in range(0, len(xs), n)]
+
+def pairs(xs):
+    return chunks(xs, n)
+
+# find all ints, including negative ones, in a string
+def ints(s):
+    return list(map(int, findall(r"-?\d+", s)))
+
+# finds all simple strings and digits, including negative ints
+def tokens(s):
+    return findall(r"[A-Za-z0-9\-]+", s)
+
+# is this string an int?
+def isint(s):
+    return s.isdigit() or (s and s[0] in ('+', '-') and s[1:].isdigit())
+
+# make ints of everything that looks like one
+def intify(xs):
+    return [int(x) if isint(x) else x for x in xs]
+
+# turn an str or int into a binary str
+# if length is given, left pad to bit string of length
+def binary(i, length=0):
+    b = "{0:b}".format(int(i))
+    if length:
+        return b.rjust(length, '0')
+    else:
+        return b
+
+# split a string at any character in seps
+# returns list of strings, excluding any empty substrings
+def msplit(s, seps):
+    def f(s, seps):
+        p = 0
+        for i, c in enumerate(s):
+            if c in seps:
+                yield s[p:i]
+                p = i + 1
+        yield s[p:]
+    return list(filter(lambda s: s, f(s, seps)))
+
+# length of an iterator
+def ilen(iter):
+    return sum(1 for _ in iter)
+
+# removes value from collections (list, sets) without throwing exception if the value is not in the collection
+# does not mutate the provided collection, but rather returns a new collection with the value removed
+def safe_remove(v, xs):
+    xs = deepcopy(xs)
+
+    if type(xs) == list:
+        if v in xs:
+            xs.remove(v)
+    elif type(xs) == set:
+        xs.discard(v)
+
+    return xs
+
+def product(xs):
+    return prod(xs)
+
+def sign(i):
+    if i > 0:
+        return 1
+    elif i < 0:
+        return -1
+    else:
+        return 0
+
+# Graphs/geometry
+
+def manhattan(*args):
+    if len(args) == 1:
+        ax, ay = args[0]
+        bx, by = 0, 0
+    elif len(args) == 2:
+        if type(args[0]) == tuple:
+            (ax, ay), (bx, by) = args
+        else:
+            ax, ay = args
+            bx, by = 0, 0
+    elif len(args) == 4:
+        ax, ay, bx, by = args
+    return abs(ax - bx) + abs(ay - by)
+
+# graph is dict of node -> neighbours
+# returns dict of node -> best level and dict of node -> best parent
+def exhaustive_bfs(graph, start):
+    q = deque([start])
+    levels = {start: 0}
+    parent = {start: None}
+
+    level = 1
+    while q:
+        v = q.popleft()
+        for n in graph[v]:
+            if n not in levels:
+                q.append(n)
+                levels[n] = level
+                parent[n] = v
+        level += 1
+    return levels, parent
+
+# The searches below keep one parent per node, and only build the path to
+# the node they end up at. with distance, they keep the distance to each
+# node instead, and return that rather than a path
+
+# path from start to node, following parents
+def unwind(parent, start, node):
+    path = [node]
+    while node != start:
+        node = parent[node]
+        path.append(node)
+    path.reverse()
+    return path
+
+# graph is dict of node -> neighbours
+# end is predicate function
+# returns path from start to end, or with distance, its length
+def bfs(graph, start, end, distance=False):
+    q = deque([start])
+    # node -> parent, or distance from start
+    seen = {start: 0 if distance else None}
+
+    while q:
+        v = q.popleft()
+        for n in graph[v]:
+            if end(n):
+                return seen[v] + 1 if distance else unwind(seen, start, v) + [n]
+            if n not in seen:
+                seen[n] = seen[v] + 1 if distance else v
+                q.append(n)
+
+# return all paths between start and end
+# graph is dict of node -> neighbours
+# end is predicate function
+# returns list of paths from start to end, or with distance, their lengths
+def bfs_all_paths(graph, start, end, cyclic=False, distance=False):
+    # paths are linked lists of (node, rest of the path, length), sharing
+    # their beginnings
+    q = deque([(start, None, 0)])
+    paths = []
+
+    def nodes(path):
+        while path:
+            yield path[0]
+            path = path[1]
+
+    while q:
+        path = q.popleft()
+        v, _, length = path
+        for n in graph[v]:
+            if cyclic and n in nodes(path):
+                continue
+
+            p = (n, path, length + 1)
+            if end(n):
+                paths.append(length + 1 if distance else list(nodes(p))[::-1])
+            else:
+                q.append(p)
+    return paths
+
+# the nodes reachable from start, or all nodes in graph, and the number of
+# edges into each from the others. graph is dict of node -> nodes after it
+def indegrees(graph, start=None):
+    if start is None:
+        nodes = set(graph) | set(chain.from_iterable(graph.values()))
+    else:
+        nodes = set([start])
+        stack = [start]
+        while stack:
+            for n in graph.get(stack.pop(), ()):
+                if n not in nodes:
+                    nodes.add(n)
+                    stack.append(n)
+
+    indeg = dict.fromkeys(nodes, 0)
+    for node in nodes:
+        for n in graph.get(node, ()):
+            indeg[n] += 1
+    return indeg
+
+class CycleError(Exception):
+    def __init__(self, cycle):
+        Exception.__init__(self, "cycle: %s" % " -> ".join(map(str, cycle)))
+        self.cycle = cycle
+
+# a cycle among nodes, which all have an edge into them from another of them,
+# as the ones left over by a topological sort do
+def find_cycle(graph, nodes):
+    nodes = set(nodes)
+    before = {}
+    for node in nodes:
+        for n in graph.get(node, ()):
+            if n in nodes:
+                before[n] = node
+
+    # walk backwards until a node comes round again. seen is node -> step
+    node = next(iter(nodes))
+    seen = {}
+    while node not in seen:
+        seen[node] = len(seen)
+        node = before[node]
+    return list(seen)[seen[node]:][::-1]
+
+# topological sort of the nodes reachable from start, or all nodes, where
+# graph is dict of node -> nodes after it. when more than one node could go
+# next, the least does. raises CycleError if there is no such order
+def top_sort(graph, start=None):
+    indeg = indegrees(graph, start)
+    ready = [n for n, d in indeg.items() if d == 0]
+    heapify(ready)
+    result = []
+    while ready:
+        node = heappop(ready)
+        result.append(node)
+        for n in graph.get(node, ()):
+            indeg[n] -= 1
+            if indeg[n] == 0:
+                heappush(ready, n)
+
+    if len(result) < len(indeg):
+        raise CycleError(find_cycle(graph, [n for n, d in indeg.items() if d]))
+    return result
+
+# run the nodes of graph, as for top_sort, as tasks on a number of workers.
+# a task takes duration(task), and can start when all before it are done,
+# the least ready task first. time jumps from one finish to the next.
+# returns the time when all are done, and the tasks in the order finished
+def schedule(graph, workers, duration, start=None):
+    assert workers > 0
+    indeg = indegrees(graph, start)
+    ready = [n for n, d in indeg.items() if d == 0]
+    heapify(ready)
+    # (finish time, task)
+    running = []
+    done = []
+    time = 0
+    while ready or running:
+        while ready and len(running) < workers:
+            task = heappop(ready)
+            heappush(running, (time + duration(task), task))
+
+        # all tasks finishing now release theirs before any is started
+        time = running[0][0]
+        while running and running[0][0] == time:
+            _, task = heappop(running)
+            done.append(task)
+            for n in graph.get(task, ()):
+                indeg[n] -= 1
+                if indeg[n] == 0:
+                    heappush(ready, n)
+
+    if len(done) < len(indeg):
+        raise CycleError(find_cycle(graph, [n for n, d in indeg.items() if d]))
+    return time, done
+
+orthogonal = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+adjacent = [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# iterator over orthogonal coords from x and y
+def iter_orthogonal(x, y, grid=None):
+    for dx, dy in orthogonal:
+        xx = x + dx
+        yy = y + dy
+        if not grid or in_grid(grid, xx, yy):
+            yield xx, yy
+
+# iterator over adjacent coords from x and y
+# if grid (list of lists) is provided, only coords in bound of the grid will be returned
+def iter_adjacent(x, y, grid=None):
+    for dx, dy in adjacent:
+        xx = x + dx
+        yy = y + dy
+        if not grid or in_grid(grid, xx, yy):
+            yield xx, yy
+
+# check if coordinate is in grid. grid is list of lists
+def in_grid(grid, x, y):
+    return x >= 0 and y >= 0 and y < len(grid) and x < len(grid[y])
+
+# get the value in grid (list of lists). Return default if x, y is out of bounds
+def grid_get(grid, x, y, default=None):
+    if in_grid(grid, x, y):
+        return grid[y][x]
+    else:
+        return default
+
+# convert grid (list of lists) into a dict (x, y) -> value
+def grid_to_dict(grid):
+    d = dict()
+    for y, row in enumerate(grid):
+        for x, v in enumerate(row):
+            d[(x, y)] = v
+    return d
+
+# maze = [[0, 0], [0, 1]]
+# is_neighbour is a predicate to check if one can navigate from one node to
+# another
+# is_neighbour(current_coord, current_value, neighbour_coord, neighbour_value)
+# result in graph of dict of node -> neighbours
+#
+# Example, maze where false values are navigatable
+# maze_to_graph(maze, start, lambda _, __, ___, x: not x)
+#
+def maze_to_graph(maze, start, is_neighbour):
+    q = [start]
+    seen = set([start])
+    g = defaultdict(list)
+    w = len(maze[0])
+    h = len(maze)
+
+    while q:
+        c = heappop(q)
+        cx, cy = c
+
+        for nx, ny in iter_adjacent(cx, cy, maze):
+            n = nx, ny
+
+            if is_neighbour(c, maze[cy][cx], n, maze[ny][nx]):
+                g[c].append(n)
+
+                if n not in seen:
+                    heappush(q, n)
+                    seen.add(n)
+    return g
+
+# Grid in one flat bytearray, row by row, inside a border of pad cells.
+# Cells are ints, indices into cells, and the neighbours of any cell inside
+# the border are at fixed offsets from it, so walks need no bounds checks,
+# only a pad value they stop at. Values are bytes, for grids from text, the
+# character codes.
+#
+# g = Grid.from_text(lines)
+# for i in g:
+#     n = sum(g.cells[i + d] == ord("#") for d in g.adjacent)
+class Grid:
+    def __init__(self, w, h, fill=0, pad=0):
+        self.w = w
+        self.h = h
+        self.pad = pad
+        # length of a row, with a border cell at each end
+        self.stride = s = w + 2
+        self.cells = bytearray([pad]) * (s * (h + 2))
+        if fill != pad:
+            for y in range(h):
+                self.row(y)[:] = bytes([fill]) * w
+        # offsets to neighbours, in the order of orthogonal and adjacent
+        self.orthogonal = [dx + dy * s for dx, dy in orthogonal]
+        self.adjacent = [dx + dy * s for dx, dy in adjacent]
+
+    # grid of the characters in lines, which must all be the same length
+    @classmethod
+    def from_text(cls, lines, pad=" "):
+        lines = [l.rstrip("\n").encode() for l in lines]
+        lines = [l for l in lines if l]
+        w = len(lines[0])
+        assert all(len(l) == w for l in lines)
+        g = cls(w, len(lines), pad=ord(pad))
+        p = pad.encode()
+        g.cells = bytearray(p * (w + 2) + b"".join(p + l + p for l in lines) + p * (w + 2))
+        return g
+
+    def index(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def coord(self, i):
+        y, x = divmod(i, self.stride)
+        return x - 1, y - 1
+
+    def __getitem__(self, p):
+        return self.cells[self.index(*p)]
+
+    def __setitem__(self, p, v):
+        self.cells[self.index(*p)] = v
+
+    # indices of the cells inside the border, row by row
+    def __iter__(self):
+        for y in range(self.h):
+            i = self.index(0, y)
+            yield from range(i, i + self.w)
+
+    # view of row y, without the border, writes go to the grid
+    def row(self, y):
+        i = self.index(0, y)
+        return memoryview(self.cells)[i:i + self.w]
+
+    # indices of cells with value v, a byte or a character
+    def find(self, v):
+        v = ord(v) if isinstance(v, str) else v
+        return [i for i in self if self.cells[i] == v]
+
+    # number of cells with value v, a byte or a character
+    def count(self, v):
+        v = ord(v) if isinstance(v, str) else v
+        border = 2 * (self.stride + self.h) if v == self.pad else 0
+        return self.cells.count(v) - border
+
+    def lines(self):
+        return [self.row(y).tobytes().decode() for y in range(self.h)]
+
+    def copy(self):
+        return deepcopy(self)
+
+    # the graph of moves by offsets (default orthogonal) between cells with
+    # values in passable (bytes or str), in compressed sparse row form: the
+    # neighbours of cell i are indices[indptr[i]:indptr[i + 1]]. returns
+    # (indptr, indices)
+    def to_graph(self, passable, offsets=None):
+        offsets = offsets or self.orthogonal
+        ok = bytearray(256)
+        for v in passable.encode() if isinstance(passable, str) else passable:
+            ok[v] = 1
+        # only cells inside the border have neighbours
+        assert not ok[self.pad]
+
+        cells = self.cells
+        indptr = array("l", [0])
+        indices = array("l")
+        for i, v in enumerate(cells):
+            if ok[v]:
+                indices.extend(j for j in (i + d for d in offsets) if ok[cells[j]])
+            indptr.append(len(indices))
+        return indptr, indices
+
+# distance to every node from start in a graph as from Grid.to_graph, -1
+# for those that can't be reached
+def csr_bfs(graph, start):
+    indptr, indices = graph
+    dist = array("l", [-1]) * (len(indptr) - 1)
+    dist[start] = 0
+    q = deque([start])
+    while q:
+        i = q.popleft()
+        d = dist[i] + 1
+        for j in indices[indptr[i]:indptr[i + 1]]:
+            if dist[j] < 0:
+                dist[j] = d
+                q.append(j)
+    return dist
+
+# Best first search. neighbours(node) yields (node, cost) pairs. with a
+# heuristic(node), an estimate of the cost left that never overestimates,
+# this is A*, otherwise Dijkstra. Queue entries made stale by a cheaper path
+# are skipped when popped, rather than removed. Stats on the last run are
+# in expanded (nodes popped and expanded), pushed and max_queue.
+#
+# s = Search(neighbours, heuristic)
+# cost, node = s.run(start, lambda n: n == goal)
+# s.path(node)
+class Search:
+    def __init__(self, neighbours, heuristic=None):
+        self.neighbours = neighbours
+        self.heuristic = heuristic or (lambda n: 0)
+
+    # search from start until a node where goal is true is expanded, and
+    # return (cost, node), or None if there is none. without goal, search
+    # everything reachable, the cost of each node is in self.cost after
+    def run(self, start, goal=None):
+        neighbours, h = self.neighbours, self.heuristic
+        self.start = start
+        # node -> cheapest cost found, and parent on that path
+        cost = self.cost = {start: 0}
+        parent = self.parent = {start: None}
+        self.expanded = self.pushed = self.max_queue = 0
+
+        # on equal estimates, the node furthest along goes first, then the
+        # one pushed first, so that nodes needn't be comparable
+        tie = count()
+        q = [(h(start), 0, next(tie), start)]
+        while q:
+            self.max_queue = max(self.max_queue, len(q))
+            _, g, _, node = heappop(q)
+            g = -g
+            if g > cost[node]:
+                continue
+            self.expanded += 1
+
+            if goal and goal(node):
+                return g, node
+
+            for n, c in neighbours(node):
+                gn = g + c
+                if gn < cost.get(n, gn + 1):
+                    cost[n] = gn
+                    parent[n] = node
+                    heappush(q, (gn + h(n), -gn, next(tie), n))
+                    self.pushed += 1
+        return None
+
+    # path from start to node, in the last run
+    def path(self, node):
+        return unwind(self.parent, self.start, node)
+
+# shortest path on a graph of dict of node -> neighbours, all a step apart,
+# with manhattan distance as the heuristic. returns path from start to goal,
+# or with distance, its length
+def astar(graph, start, goal, distance=False):
+    s = Search(lambda n: ((x, 1) for x in graph[n]), lambda n: manhattan(n, goal))
+    found = s.run(start, lambda n: n == goal)
+    if found:
+        return found[0] if distance else s.path(goal)
+
+# returns all transpositions of a list of lists, that is, all rotations and mirrored versions
+# e.g. ["12", "34"] => [["12", "34"], ["21", "43"], ["34", "12"], ["43", "21"], ["13", "24"], ["31", "42"], ["24", "13"], ["42", "31"]]
+# if the input is a list of strings, a list of strings will be returned. same for tuples
+def transpositions(xs):
+    ts = []
+    # rows
+    for ystep in [1, -1]:
+        for xstep in [1, -1]:
+            ts.append([row[::xstep] for row in xs[::ystep]])
+
+    is_strings = type(xs[0]) == str
+    is_tuples = type(xs[0]) == tuple
+    # columns
+    for ystep in [1, -1]:
+        for xstep in [1, -1]:
+            out = []
+            for cols in list(zip(*xs))[::ystep]:
+                cols = cols[::xstep]
+                if is_strings:
+                    cols = "".join(cols)
+                elif is_tuples:
+                    cols = tuple(cols)
+                out.append(cols)
+            ts.append(out)
+
+    return ts
+
+# check(i), return True if i is too large
+# returns the largest value where check is false, and the smallest where check
+# is true (just to remember to think about the one-off :)
+def binary_search(lo, hi, check):
+    blo = check(lo)
+    bhi = check(hi)
+    if blo == bhi:
+        assert False, "lo and hi both %s" % blo
+
+    while True:
+        x = (lo + hi) // 2
+        if check(x):
+            if not check(x-1):
+                return (x-1, x)
+            hi = x
+        else:
+            lo = x
+
+# find the cycle in x0, f(x0), f(f(x0)), ... with Brent's algorithm, in
+# constant memory. returns (lam, mu), the length of the cycle and the index
+# of the first element in it
+def brent(f, x0):
+    power = lam = 1
+    tortoise = x0
+    hare = f(x0)
+    while tortoise != hare:
+        if power == lam:
+            tortoise = hare
+            power *= 2
+            lam = 0
+        hare = f(hare)
+        lam += 1
+
+    tortoise = hare = x0
+    for _ in range(lam):
+        hare = f(hare)
+    mu = 0
+    while tortoise != hare:
+        tortoise = f(tortoise)
+        hare = f(hare)
+        mu += 1
+    return lam, mu
+
+# Memoize, use with @Memoize, or @memoize(maxsize=..) for options.
+#
+# maxsize bounds the number of results kept, the least recently used are
+# evicted first. key(*args, **kwargs) makes the cache key, for arguments
+# that aren't hashable. with path, results are also kept in a shelve file
+# there, keyed by a hash of the repr of the function name and key, and
+# survive between runs. that only works for keys of plain values, such as
+# numbers, strings and tuples of them, whose repr is the same in every
+# run. for anything else, pass a key that makes one. Counts of hits,
+# misses and evictions are kept, disk hits are counted both as hits and
+# disk_hits
+class Memoize:
+    def __init__(self, f, maxsize=None, key=None, path=None):
+        self.f = f
+        self.maxsize = maxsize
+        self.key = key
+        self.path = path
+        self.disk = None
+        self.memo = OrderedDict()
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+
+    def __call__(self, *args, **kwargs):
+        if self.key:
+            k = self.key(*args, **kwargs)
+        else:
+            k = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        memo = self.memo
+        if k in memo:
+            self.hits += 1
+            if self.maxsize is not None:
+                memo.move_to_end(k)
+            #Warning: You may wish to do a deepcopy here if returning objects
+            return memo[k]
+
+        if self.path:
+            h = self.digest(k)
+            disk = self.open()
+            if h in disk:
+                self.hits += 1
+                self.disk_hits += 1
+                v = disk[h]
+                self.store(k, v)
+                return v
+
+        self.misses += 1
+        v = self.f(*args, **kwargs)
+        self.store(k, v)
+        if self.path:
+            self.disk[h] = v
+        return v
+
+    def store(self, k, v):
+        memo = self.memo
+        memo[k] = v
+        if self.maxsize is not None and len(memo) > self.maxsize:
+            memo.popitem(last=False)
+            self.evictions += 1
+
+    def digest(self, k):
+        return sha256(repr((self.f.__qualname__, k)).encode()).hexdigest()
+
+    def open(self):
+        if self.disk is None:
+            self.disk = shelve.open(self.path)
+            atexit.register(self.close)
+        return self.disk
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    def __len__(self):
+        return len(self.memo)
+
+    # forget everything in memory, and on disk with disk, and reset counts
+    def clear(self, disk=False):
+        self.memo.clear()
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+        if disk and self.path:
+            self.open().clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "disk_hits": self.disk_hits, "size": len(self.memo)}
+
+def memoize(maxsize=None, key=None, path=None):
+    return lambda f: Memoize(f, maxsize, key, path)
+
+# Maths
+
+# sieve of Eratosthenes, returns a bytearray where s[x] is 1 if x is prime,
+# for x < n
+def sieve(n):
+    s = bytearray([1]) * n
+    for x in range(min(n, 2)):
+        s[x] = 0
+    for p in range(2, isqrt(max(n - 1, 0)) + 1):
+        if s[p]:
+            s[p * p::p] = bytes(len(range(p * p, n, p)))
+    return s
+
+# segmented sieve for lo <= x < hi, a segment of at most size numbers at a
+# time, so that memory doesn't depend on hi. yields (start, s) where s[i] is
+# 1 if start + i is prime
+def segmented_sieve(lo, hi, size=1 << 16):
+    small = sieve(isqrt(max(hi - 1, 0)) + 1)
+    ps = [p for p, is_prime in enumerate(small) if is_prime]
+    for start in range(lo, hi, size):
+        end = min(start + size, hi)
+        s = bytearray([1]) * (end - start)
+        for p in ps:
+            if p * p >= end:
+                break
+            first = max(p * p, (start + p - 1) // p * p)
+            s[first - start::p] = bytes(len(range(first, end, p)))
+        for x in range(start, min(end, 2)):
+            s[x - start] = 0
+        yield start, s
+
+# number of composites in the range r, e.g. range(b, c + 1, 17)
+def count_composites(r):
+    assert r.start >= 0 and r.step > 0
+    n = 0
+    if not r:
+        return n
+    for start, s in segmented_sieve(r[0], r[-1] + 1):
+        k = max(0, -(-(start - r.start) // r.step))
+        for x in range(r.start + k * r.step, start + len(s), r.step):
+            if x > 1 and not s[x - start]:
+                n += 1
+    return n
+
+# least common multiple
+def lcm(*args):
+    if len(args) == 2:
+        a, b = args
+        return abs(a*b) // gcd(a, b)
+    elif len(args) > 2:
+        return reduce(lcm, args)
+
+# find the smallest number x, such that x % n = a for each n and a in nx, ax
+# ax thus is a list of mod remainders
+# note that remainders in ax should be negative
+#
+# Adapted from https://rosettacode.org/wiki/Chinese_remainder_theorem#Python_3.6
+def chinese_remainder(nx, ax):
+    prod = product(nx)
+
+    s = 0
+    for n, a in zip(nx, ax):
+        p = prod // n
+
+        s += a * mul_inv(p, n) * p
+
+    return s % prod
+
+# return x, such that (a * x) % m == 1, 0 <= x <= m
+def mul_inv(a, m):
+    m0 = m
+    x0, x1 = 0, 1
+
+    if m == 1:
+        return 1
+
+    while a > 1:
+        q = a // m
+        a, m = m, a % m
+        x0, x1 = x1 - q * x0, x0
+
+    if x1 < 0:
+        x1 += m0
+
+    return x1
+
+# for a dict where values are list of possible options, this will reduce that down to the one unique option for each item.
+# for example, given a dict of:
+# {
+#   0: [1, 2, 3],
+#   1: [2],
+#   2: [2, 3]
+# }
+#
+# will give:
+# {
+#   0: 1,
+#   1: 2,
+#   2: 3
+# }
+#
+# keys can be any value
+#
+# this function assumes that all options can be trivially assigned. if that's not the case, look at max_bipartite_matching below.
+#
+# keeping this one around since it might be easier to reason about or to modify
+def reduce_unique_options(d):
+    def car(xs):
+        return next(iter(xs))
+
+    d = deepcopy(d)
+
+    def all1(xs):
+        return all(len(x) == 1 for x in xs)
+
+    # reduce by looking at cases where there is only one available option. do this until only one remain for each
+    while not all1(d.values()):
+        for v in d.values():
+            if len(v) == 1:
+
+                vvv = car(v)
+
+                # delete from all values, except self
+                for k, vv in d.items():
+                    if vv != v:
+                        d[k] = safe_remove(vvv, vv)
+
+    return {k:car(v) for k, v in d.items()}
+
+# max bipartite matching
+# takes a graph of thing => possible options and find the best matching of each thing => option
+# this code uses an example of job applicants => open jobs, and returns the best matching of applicant => job
+# if an applicant can't be assigned to a job, it will not be included in the output
+#
+# based on https://www.geeksforgeeks.org/maximum-bipartite-matching/
+def max_bipartite_matching(graph):
+
+    jobs = set.union(*[set(v) for v in graph.values()])
+
+    # a dict of job => applicant, to keep track of the applicants assigned to jobs
+    assignments = dict()
+
+    # a DFS based recursive function that returns true if an assignment for job is possible
+    def bpm(applicant, seen=set()):
+
+        # Try every job one by one, except those already seen
+        for job in jobs - seen:
+            # if applicant is interested in job
+            if job in graph[applicant]:
+                # mark job as seen
+                seen.add(job)
+
+                # if job is not assigned to an applicant OR previously assigned applicant for job has an alternate job available.
+                # since job is marked as seen in the above line, assignments[job] in the following recursive call will not get job again
+                if job not in assignments or bpm(assignments[job], seen):
+                    assignments[job] = applicant
+                    return True
+        return False
+
+    # for each applicant
+    for applicant in graph.keys():
+        # try to assign a job to the applicant
+        bpm(applicant)
+
+    # find it easier to get the result in the same way as the input,
+    # so return a dict of who gets assigned to which job by inversing the assignments
+    return {v:k for k, v in assignments.items()}
+
+# hex stuff
+# https://www.redblobgames.com/grids/hexagons/#coordinates-cube
+
+# hex adjecent 3D cubes with east-west orientation
+hex_adjacent_ew = {
+    "e": (1, 0, -1),
+    "w": (-1, 0, 1),
+    "se": (0, 1, -1),
+    "nw": (0, -1, 1),
+    "ne": (1, -1, 0),
+    "sw": (-1, 1, 0)
+}
+
+# hex adjecent 3D cubes with north-south orientation
+hex_adjacent_ns = {
+    "n": (0, -1, 1),
+    "s": (0, 1, -1),
+    "se": (1, 0, -1),
+    "nw": (-1, 0, 1),
+    "ne": (1, -1, 0),
+    "sw": (-1, 1, 0)
+}
\ No newline at end of file
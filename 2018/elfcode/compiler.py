@@ -0,0 +1,140 @@
+import sys
+from elfcode import *
+
+# Compiling Elfcode engine. The whole program is turned into one Python
+# function, with the registers in locals and an if statement per basic
+# block, in program order, so that falling through to the next block is
+# free. Reads of the ip register are constants and writes to it jumps, as
+# in Elfcode. Recognized loops are compiled to their closed form. A jump
+# to the middle of a block leaves the function, and runs through the
+# Elfcode interpreter until it gets to the start of one.
+#
+# python3 compiler.py < input.txt prints the compiled program
+
+# registers read by op, as a subset of "ab"
+def reads(op):
+    e = exprs[op]
+    return ("a" if "{A}" in e else "") + ("b" if "{B}" in e else "")
+
+# the start of all basic blocks: 0, after each jump, and the targets of
+# jumps that can be worked out. jumps adding a register to the ip are
+# assumed to add 0 or 1, the result of a comparison
+def leaders(prog, ipb, loops, until=None):
+    result = set([0])
+    for ip, (o, a, b, c) in enumerate(prog):
+        if c != ipb:
+            continue
+        result.add(ip + 1)
+        regs = [x for x, r in zip((a, b), "ab") if r in reads(o)]
+        if all(x == ipb for x in regs):
+            reg = [0] * (max(a, b, c) + 1)
+            reg[ipb] = ip
+            ops[o](a, b, c, reg)
+            result.add(reg[ipb] + 1)
+        elif o == "addr" and ipb in (a, b):
+            result.add(ip + 2)
+    for start, (end, _) in loops.items():
+        result.add(start)
+        result.add(end)
+    if until is not None:
+        result.add(until)
+    return sorted(x for x in result if 0 <= x < len(prog))
+
+# statements of the block from start to end, setting ip to the next block,
+# and counting the instructions executed in steps
+def block(prog, ipb, start, end, loops):
+    if start in loops:
+        stop, body = loops[start]
+        return body + ["ip = %s" % stop, "steps += 1"]
+
+    def reg(x, ip):
+        return str(ip) if x == ipb else "r%s" % x
+
+    lines = []
+    ip = start
+    while ip < end:
+        o, a, b, c = prog[ip]
+        e = exprs[o].format(a=a, b=b, A=reg(a, ip), B=reg(b, ip))
+        ip += 1
+        if c == ipb:
+            lines.append("ip = %s + 1" % e)
+            break
+        lines.append("r%s = %s" % (c, e))
+    else:
+        lines.append("ip = %s" % end)
+    lines.append("steps += %s" % (ip - start))
+    return lines
+
+# source of run(r, ip, limit), which runs from ip with registers r until it
+# gets to until, or an ip that isn't the start of a block, or has executed
+# at least limit instructions. returns (ip, instructions executed)
+def source(prog, ipb, nregs, until=None, optimize=True):
+    found = loops(prog, ipb, lambda x: "r%s" % x) if optimize else {}
+    starts = leaders(prog, ipb, found, until)
+    regs = ", ".join("r%s" % x for x in range(nregs))
+
+    lines = [
+        "leaders = frozenset(%s)" % starts,
+        "",
+        "def run(r, ip, limit):",
+        "    %s, = r" % regs,
+        "    steps = 0",
+        "    while ip in leaders and steps < limit:",
+    ]
+    for k, start in enumerate(starts):
+        end = starts[k + 1] if k + 1 < len(starts) else len(prog)
+        if start == until:
+            # always run at least one block, to be able to resume from until
+            lines += ["        if ip == %s and steps:" % start, "            break"]
+        lines.append("        if ip == %s:" % start)
+        lines += ["            " + l for l in block(prog, ipb, start, end, found)]
+    lines += [
+        "    r[:] = %s," % regs,
+        "    return ip, steps",
+    ]
+    return "\n".join(lines) + "\n"
+
+class CompiledElfcode(Elfcode):
+    def __init__(self, prog, ipb=None, reg=None, optimize=True):
+        Elfcode.__init__(self, prog, ipb, reg, optimize)
+        self.optimize = optimize
+        # until -> (run, leaders)
+        self.compiled = {}
+
+    def compile(self, until):
+        if until not in self.compiled:
+            env = {"divisor_sum": divisor_sum}
+            exec(source(self.prog, self.ipb, len(self.reg), until, self.optimize), env)
+            self.compiled[until] = (env["run"], env["leaders"])
+        return self.compiled[until]
+
+    # as Elfcode.run, except that limit is only checked between blocks, and
+    # may be overshot by a block
+    def run(self, until=None, limit=None):
+        f, starts = self.compile(until)
+        code = self.code
+        r = self.reg
+        ip = self.ip
+        n = len(code)
+        limit = sys.maxsize if limit is None else limit
+        steps = 0
+        try:
+            while 0 <= ip < n:
+                if ip in starts:
+                    ip, k = f(r, ip, limit - steps)
+                    steps += k
+                else:
+                    ip = code[ip](r)
+                    steps += 1
+                if (ip == until and steps) or steps >= limit:
+                    break
+        finally:
+            self.ip = ip
+            self.steps += steps
+            if self.ipb is not None and steps:
+                r[self.ipb] = ip - 1
+        return 0 <= ip < n
+
+if __name__ == "__main__":
+    ipb, prog = parse(sys.stdin)
+    print(source(prog, ipb, 6))
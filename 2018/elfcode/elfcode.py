@@ -0,0 +1,244 @@
+import sys
+
+# Elfcode, the language of the wrist device in 2018 days 16, 19 and 21
+
+# value of each op, in terms of a and b as immediates, and A and B as the
+# registers a and b
+exprs = {
+    "addr": "{A} + {B}",
+    "addi": "{A} + {b}",
+    "mulr": "{A} * {B}",
+    "muli": "{A} * {b}",
+    "banr": "{A} & {B}",
+    "bani": "{A} & {b}",
+    "borr": "{A} | {B}",
+    "bori": "{A} | {b}",
+    "setr": "{A}",
+    "seti": "{a}",
+
+    "gtir": "int({a} > {B})",
+    "gtri": "int({A} > {b})",
+    "gtrr": "int({A} > {B})",
+
+    "eqir": "int({a} == {B})",
+    "eqri": "int({A} == {b})",
+    "eqrr": "int({A} == {B})",
+}
+
+names = list(exprs)
+
+def define(src, name, **env):
+    exec(src, env)
+    return env[name]
+
+# the ops as functions of (a, b, c, reg), e.g. ops["addr"](a, b, c, reg)
+ops = {}
+for name, e in exprs.items():
+    ops[name] = define("def %s(a, b, c, reg):\n    reg[c] = %s\n" % (name, e.format(a="a", b="b", A="reg[a]", B="reg[b]")), name)
+
+def parse_instr(line):
+    op, a, b, c = line.split()
+    return op, int(a), int(b), int(c)
+
+# returns (ip register, list of (op, a, b, c))
+def parse(f):
+    lines = [l.strip() for l in f if l.strip()]
+    ipb = None
+    if lines[0].startswith("#ip"):
+        ipb = int(lines[0].split()[1])
+        lines = lines[1:]
+    return ipb, list(map(parse_instr, lines))
+
+# the only instruction reading register 0, the equality check that halts the
+# program in day 21. returns its ip, and a function of the registers giving
+# the value register 0 must equal to halt there
+def find_check(prog):
+    found = []
+    for ip, (o, a, b, _) in enumerate(prog):
+        if o == "eqrr" and 0 in (a, b):
+            r = b if a == 0 else a
+            found.append((ip, lambda reg, r=r: reg[r]))
+        elif (o == "eqri" and a == 0) or (o == "eqir" and b == 0):
+            k = b if a == 0 else a
+            found.append((ip, lambda reg, k=k: k))
+    assert len(found) == 1, "expected one check of register 0, found %s" % len(found)
+    return found[0]
+
+# Loop recognition
+#
+# Patterns of instructions that can be replaced as a whole by a closed form.
+# In a pattern, names are registers, $names are immediates, ip is the ip
+# register, _ is anything, numbers are themselves, and @k is a jump to the
+# instruction at offset k in the pattern. The closed form is a body of statements
+# in terms of the names, that leaves the registers as the loop would.
+
+# acc += sum of the divisors of n, by trying all pairs i, j in 1..n
+divisor_sum_loop = [
+    ("seti", "1", "_", "i"),
+    ("seti", "1", "_", "j"),
+    ("mulr", "i", "j", "t"),
+    ("eqrr", "t", "n", "t"),
+    ("addr", "t", "ip", "ip"),
+    ("addi", "ip", "1", "ip"),
+    ("addr", "i", "acc", "acc"),
+    ("addi", "j", "1", "j"),
+    ("gtrr", "j", "n", "t"),
+    ("addr", "ip", "t", "ip"),
+    ("seti", "@2", "_", "ip"),
+    ("addi", "i", "1", "i"),
+    ("gtrr", "i", "n", "t"),
+    ("addr", "t", "ip", "ip"),
+    ("seti", "@1", "_", "ip"),
+]
+
+divisor_sum_body = """\
+{acc} += divisor_sum({n})
+{i} = {j} = max({n}, 1) + 1
+{t} = 1"""
+
+# j = n // k, by counting j up until (j + 1) * k > n
+division_loop = [
+    ("seti", "0", "_", "j"),
+    ("addi", "j", "1", "t"),
+    ("muli", "t", "$k", "t"),
+    ("gtrr", "t", "n", "t"),
+    ("addr", "t", "ip", "ip"),
+    ("addi", "ip", "1", "ip"),
+    ("seti", "@9", "_", "ip"),
+    ("addi", "j", "1", "j"),
+    ("seti", "@1", "_", "ip"),
+]
+
+division_body = """\
+{j} = max({n}, 0) // {k}
+{t} = 1"""
+
+def divisor_sum(n):
+    s = 0
+    d = 1
+    while d * d <= n:
+        if n % d == 0:
+            s += d
+            if d * d != n:
+                s += n // d
+        d += 1
+    return s
+
+# (pattern, closed form, check of the bound names)
+patterns = [
+    (divisor_sum_loop, divisor_sum_body, lambda env: True),
+    (division_loop, division_body, lambda env: env["$k"] > 0),
+]
+
+commutative = {"addr", "mulr", "banr", "borr", "eqrr"}
+
+def unify(env, sym, x, start):
+    if sym == "_":
+        return True
+    elif sym.isdigit():
+        return x == int(sym)
+    elif sym[0] == "@":
+        # a jump goes to the instruction after the value written
+        return x == start + int(sym[1:]) - 1
+    elif sym in env:
+        return env[sym] == x
+    elif sym[0] != "$" and x in [v for k, v in env.items() if k[0] != "$"]:
+        return False
+    env[sym] = x
+    return True
+
+# returns the names bound by the pattern, or None if it doesn't match at
+# start
+def match(pattern, prog, start, ipb):
+    if ipb is None or start + len(pattern) > len(prog):
+        return None
+    env = {"ip": ipb}
+    for (po, pa, pb, pc), (o, a, b, c) in zip(pattern, prog[start:]):
+        if po != o:
+            return None
+        for x, y in [(a, b), (b, a)] if o in commutative else [(a, b)]:
+            e = dict(env)
+            if unify(e, pa, x, start) and unify(e, pb, y, start) and unify(e, pc, c, start):
+                env = e
+                break
+        else:
+            return None
+    return env
+
+# returns {start: (end, statements)} for the loops found in prog, where the
+# statements are the closed form of the loop, with register x written as
+# reg(x), and end is where the loop exits to
+def loops(prog, ipb, reg):
+    found = {}
+    for start in range(len(prog)):
+        for pattern, body, check in patterns:
+            env = match(pattern, prog, start, ipb)
+            if env is not None and check(env):
+                names = {k.lstrip("$"): v if k[0] == "$" else reg(v) for k, v in env.items()}
+                found[start] = (start + len(pattern), body.format(**names).split("\n"))
+    return found
+
+class Elfcode:
+    # with optimize, recognized loops are replaced with a closed form. such
+    # a loop counts as one step
+    def __init__(self, prog, ipb=None, reg=None, optimize=False):
+        self.prog = prog
+        self.ipb = ipb
+        self.reg = reg if reg is not None else [0] * 6
+        self.ip = 0
+        # instructions executed
+        self.steps = 0
+        self.code = [self.decode(ip, *instr) for ip, instr in enumerate(prog)]
+        if optimize:
+            for ip, (end, body) in loops(prog, ipb, lambda x: "r[%s]" % x).items():
+                src = "def f(r):\n%s\n    return %s\n" % ("".join("    %s\n" % l for l in body), end)
+                self.code[ip] = define(src, "f", divisor_sum=divisor_sum)
+
+    # compile the instruction at ip into a function of the registers, which
+    # executes it and returns the next ip. as the ip register always holds
+    # ip when the instruction runs, reads of it are replaced with ip, and
+    # writes to it become jumps
+    def decode(self, ip, op, a, b, c):
+        ipb = self.ipb
+
+        def r(x):
+            return str(ip) if x == ipb else "r[%s]" % x
+
+        e = exprs[op].format(a=a, b=b, A=r(a), B=r(b))
+        if c == ipb:
+            src = "def f(r):\n    return %s + 1\n" % e
+        else:
+            src = "def f(r):\n    r[%s] = %s\n    return %s\n" % (c, e, ip + 1)
+        return define(src, "f")
+
+    def halted(self):
+        return not 0 <= self.ip < len(self.code)
+
+    # run until the program halts, ip reaches until, or limit instructions
+    # have been executed. at least one instruction is executed, so it's
+    # safe to run again with the same until. returns False if halted
+    def run(self, until=None, limit=None):
+        code = self.code
+        r = self.reg
+        ip = self.ip
+        n = len(code)
+        steps = 0
+        try:
+            while 0 <= ip < n:
+                ip = code[ip](r)
+                steps += 1
+                if ip == until or steps == limit:
+                    break
+        finally:
+            self.ip = ip
+            self.steps += steps
+            # the ip register is only kept in ip while running
+            if self.ipb is not None and steps:
+                r[self.ipb] = ip - 1
+        return 0 <= ip < n
+
+if __name__ == "__main__":
+    ipb, prog = parse(sys.stdin)
+    ec = Elfcode(prog, ipb)
+    ec.run()
+    print(ec.reg)
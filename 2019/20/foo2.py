@@ -99,13 +99,15 @@ def lev(m, a, b):
     else:
         return 0
 
+# returns the length of the shortest path from start to end
 def rec_bfs(graph, start, end):
-    q = deque([[(start, 0)]])
-    seen = set()
+    q = deque([(start, 0)])
+    # (node, level) -> distance from start
+    dist = {(start, 0): 0}
 
     while q:
-        path = q.popleft()
-        v, level = path[-1]
+        v, level = q.popleft()
+        d = dist[(v, level)] + 1
 
         for n in graph[v]:
             # detect portal
@@ -114,12 +116,10 @@ def rec_bfs(graph, start, end):
             if lvl < 0:
                 continue
 
-            p = path + [(n, lvl)]
             if end(n, lvl):
-                return p
-            if (n, lvl) not in seen:
-                q.append(p)
-                seen.add((n, lvl))
+                return d
+            if (n, lvl) not in dist:
+                q.append((n, lvl))
+                dist[(n, lvl)] = d
 
-p = rec_bfs(g, start, lambda x, l: x == goal and l == 0)
-print(len(p) - 1)
+print(rec_bfs(g, start, lambda x, l: x == goal and l == 0))
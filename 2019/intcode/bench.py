@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from intcode import *
+from jit import *
+
+# Benchmark of the Intcode engines. Runs the day 9 BOOST program in sensor
+# mode, scans a part of the day 19 tractor beam, starting a new VM for each
+# coordinate, and runs a loop that patches its own code on every iteration.
+#
+# python3 bench.py [size of day 19 scan]
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+def load(day):
+    with open(os.path.join(here, "..", str(day), "input.txt")) as f:
+        return parse(f)
+
+def boost(engine):
+    ic = engine(load(9), lambda: 2)
+    return ic.run()
+
+def beam(engine, size):
+    prog = load(19)
+    count = 0
+    for y in range(size):
+        for x in range(size):
+            inp = iter([x, y])
+            count += engine(prog, lambda: next(inp)).run()
+    return count
+
+# loops n times over an instruction whose immediate operand it increments,
+# so that it has to be decoded again each time. outputs n - 1
+def self_modifying(n):
+    return [1101, n, 0, 100,    # i = n
+            1101, 0, 0, 101,    # r = k, with k at 5
+            1001, 5, 1, 5,      # k += 1
+            1001, 100, -1, 100, # i -= 1
+            1005, 100, 4,       # loop while i
+            4, 101,
+            99]
+
+def patch(engine, n):
+    return engine(self_modifying(n), None).run()
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+for name, f in [("day 9 boost", boost),
+                ("day 19 beam %sx%s" % (size, size), lambda e: beam(e, size)),
+                ("self modifying 20000", lambda e: patch(e, 20000))]:
+    base = None
+    for engine in [Intcode, FastIntcode, JitIntcode]:
+        start = time.time()
+        result = f(engine)
+        t = time.time() - start
+        base = base or t
+        print("%-20s %-12s %8.3fs %6.1fx  (%s)" % (name, engine.__name__, t, base / t, result))
@@ -1,35 +1,50 @@
+import sys
 from collections import *
 from util import *
 
-def intasm(asm):
-    lens = {
-        "add": 4,
-        "mul": 4,
-        "inp": 2,
-        "out": 2,
-        "jit": 3,
-        "jif": 3,
-        "lt": 4,
-        "eq": 4,
-        "ext": 1,
-        "rb": 2,
-            }
+lens = {
+    "add": 4,
+    "mul": 4,
+    "inp": 2,
+    "out": 2,
+    "jit": 3,
+    "jif": 3,
+    "lt": 4,
+    "eq": 4,
+    "ext": 1,
+    "rb": 2,
+        }
 
-    ll = 0
-    labels = dict()
+# parse asm into a list of [labels, op, args] and an OrderedDict of vars
+def parse_asm(asm):
+    instrs = []
     vars = OrderedDict()
+    labels = []
     for i in asm.split("\n"):
         i = i.split("#")[0].strip()
         if i:
             if ":" in i:
-                label, i = i.split(":")
-                labels[label] = ll
-            i = i.split(" ")
+                label, i = [x.strip() for x in i.split(":")]
+                labels.append(label)
+            i = i.split()
             o = i[0]
             if o == "var":
                 vars[i[1]] = i[2]
             else:
-                ll += lens[o]
+                instrs.append([labels, o, i[1:]])
+                labels = []
+    return instrs, vars
+
+def emit(instrs, vars):
+    ll = 0
+    labels = dict()
+    for ls, o, i in instrs:
+        for label in ls:
+            labels[label] = ll
+        if o == "block":
+            ll += int(i[0])
+        else:
+            ll += lens[o]
 
     ll = [ll] # hack!
     def next_mem():
@@ -44,37 +59,14 @@ def intasm(asm):
         _ = regs[v]
 
     prog = []
-    for i in asm.split("\n"):
-        i = i.split("#")[0].strip()
-        if i:
-            if ":" in i:
-                label, i = i.split(":")
-
-            i = i.split(" ")
-            o = i[0]
-            i = i[1:]
-            out = []
-            if o == "add" or o == "mul":
-                if o == "add":
-                    op = "01"
-                else:
-                    op = "02"
-                for x in i:
-                    if isint(x):
-                        op = "1" + op
-                        out.append(int(x))
-                    elif x[0] == "&":
-                        op = "2" + op
-                        out.append(int(x[1:]))
-                    else:
-                        op = "0" + op
-                        out.append(regs[x])
-            elif o == "inp":
-                op = "03"
-                out.append(regs[i[0]])
-            elif o == "out":
-                op = "04"
-                x = i[0]
+    for _, o, i in instrs:
+        out = []
+        if o == "add" or o == "mul":
+            if o == "add":
+                op = "01"
+            else:
+                op = "02"
+            for x in i:
                 if isint(x):
                     op = "1" + op
                     out.append(int(x))
@@ -84,50 +76,66 @@ def intasm(asm):
                 else:
                     op = "0" + op
                     out.append(regs[x])
-            elif o == "jit" or o == "jif":
-                if o == "jit":
-                    op = "05"
-                else:
-                    op = "06"
-
-                x = i[0]
-                if isint(x):
-                    op = "1" + op
-                    out.append(int(x))
-                else:
-                    op = "0" + op
-                    out.append(regs[x])
+        elif o == "inp":
+            op = "03"
+            out.append(regs[i[0]])
+        elif o == "out":
+            op = "04"
+            x = i[0]
+            if isint(x):
+                op = "1" + op
+                out.append(int(x))
+            elif x[0] == "&":
+                op = "2" + op
+                out.append(int(x[1:]))
+            else:
+                op = "0" + op
+                out.append(regs[x])
+        elif o == "jit" or o == "jif":
+            if o == "jit":
+                op = "05"
+            else:
+                op = "06"
 
+            x = i[0]
+            if isint(x):
                 op = "1" + op
-                out.append(labels[i[1]])
-            elif o == "lt" or o == "eq":
-                if o == "lt":
-                    op = "07"
-                else:
-                    op = "08"
-                for x in i:
-                    if isint(x):
-                        op = "1" + op
-                        out.append(int(x))
-                    else:
-                        op = "0" + op
-                        out.append(regs[x])
-            elif o == "rb":
-                op = "09"
-                x = i[0]
+                out.append(int(x))
+            else:
+                op = "0" + op
+                out.append(regs[x])
+
+            op = "1" + op
+            out.append(labels[i[1]])
+        elif o == "lt" or o == "eq":
+            if o == "lt":
+                op = "07"
+            else:
+                op = "08"
+            for x in i:
                 if isint(x):
                     op = "1" + op
                     out.append(int(x))
                 else:
                     op = "0" + op
                     out.append(regs[x])
-            elif o == "ext":
-                op = "99"
-            elif o == "var":
-                continue
+        elif o == "rb":
+            op = "09"
+            x = i[0]
+            if isint(x):
+                op = "1" + op
+                out.append(int(x))
             else:
-                assert False
-            prog += ([int(op)] + out)
+                op = "0" + op
+                out.append(regs[x])
+        elif o == "ext":
+            op = "99"
+        elif o == "block":
+            prog += [0] * int(i[0])
+            continue
+        else:
+            assert False, o
+        prog += ([int(op)] + out)
 
     for value in vars.values():
         if isint(value):
@@ -136,3 +144,285 @@ def intasm(asm):
             prog.append(regs[value])
 
     return prog
+
+# assemble asm into an Intcode program. with optimize, the program is run
+# through the passes below, and instruction and cell counts before and
+# after, and how often each pass fired, are reported on stderr
+def intasm(asm, optimize=False):
+    instrs, vars = parse_asm(asm)
+    if optimize:
+        before = len(instrs), ilen(cells(instrs, vars))
+        stats = Counter()
+        instrs = optimized(instrs, vars, stats)
+        after = len(instrs), ilen(cells(instrs, vars))
+        print("intasm: %s -> %s instructions, %s -> %s cells (%s)" % (before[0], after[0], before[1], after[1],
+              ", ".join("%s %s" % (k, stats[k]) for k in ("fold", "fuse", "dead store", "reuse"))), file=sys.stderr)
+    return emit(instrs, vars)
+
+# Optimization passes
+#
+# These treat named cells as registers, and assume that relative (&n)
+# accesses never alias them. vars, and cells whose address is stored in a
+# var, are pinned: never removed or merged. The emitted program is always
+# ordinary Intcode.
+
+def pinned(vars):
+    return set(vars) | set(v for v in vars.values() if not isint(v))
+
+def is_cell(x):
+    return not isint(x) and x[0] != "&"
+
+# positions of args that are read and written
+def reads(o):
+    if o in ("add", "mul", "lt", "eq"):
+        return [0, 1]
+    elif o in ("out", "jit", "jif", "rb"):
+        return [0]
+    return []
+
+def writes(o):
+    if o in ("add", "mul", "lt", "eq"):
+        return [2]
+    elif o == "inp":
+        return [0]
+    return []
+
+# can the arg at position p be x? only add, mul and out handle relative args
+def accepts(o, p, x):
+    if isint(x):
+        return p not in writes(o)
+    elif x[0] == "&":
+        return o in ("add", "mul", "out")
+    return True
+
+def uses(o, i):
+    return set(i[p] for p in reads(o) if is_cell(i[p]))
+
+def defs(o, i):
+    return set(i[p] for p in writes(o) if is_cell(i[p]))
+
+def cells(instrs, vars):
+    seen = OrderedDict((v, True) for v in vars)
+    for _, o, i in instrs:
+        for p in reads(o) + writes(o):
+            if is_cell(i[p]):
+                seen[i[p]] = True
+    return seen.keys()
+
+def successors(instrs, k, labels):
+    _, o, i = instrs[k]
+    nxt = [k + 1] if k + 1 < len(instrs) else []
+    if o in ("ext", "block"):
+        return []
+    elif o == "jit" or o == "jif":
+        if isint(i[0]):
+            if (int(i[0]) != 0) == (o == "jit"):
+                return [labels[i[1]]]
+            return nxt
+        return nxt + [labels[i[1]]]
+    return nxt
+
+# returns live_out, a list of sets of cells live after each instruction
+def liveness(instrs):
+    labels = {l: n for n, (ls, _, _) in enumerate(instrs) for l in ls}
+    succ = [successors(instrs, k, labels) for k in range(len(instrs))]
+    use = [uses(o, i) for _, o, i in instrs]
+    df = [defs(o, i) for _, o, i in instrs]
+    live_in = [set() for _ in instrs]
+    live_out = [set() for _ in instrs]
+
+    changed = True
+    while changed:
+        changed = False
+        for k in reversed(range(len(instrs))):
+            out = set().union(*[live_in[s] for s in succ[k]])
+            inn = use[k] | (out - df[k])
+            if out != live_out[k] or inn != live_in[k]:
+                live_out[k] = out
+                live_in[k] = inn
+                changed = True
+    return live_out
+
+# remove instruction k, moving its labels to the next one. returns False if
+# that isn't possible
+def remove(instrs, k):
+    if instrs[k][0]:
+        if k + 1 >= len(instrs):
+            return False
+        instrs[k + 1][0] = instrs[k][0] + instrs[k + 1][0]
+    del instrs[k]
+    return True
+
+# returns the number of instructions folded
+def fold(instrs):
+    changed = 0
+    k = 0
+    while k < len(instrs):
+        ls, o, i = instrs[k]
+        new = None
+        if o in ("add", "mul", "lt", "eq") and isint(i[0]) and isint(i[1]):
+            a, b = int(i[0]), int(i[1])
+            v = {"add": a + b, "mul": a * b, "lt": int(a < b), "eq": int(a == b)}[o]
+            if [o] + i[:2] != ["add", str(v), "0"]:
+                new = ["add", [str(v), "0", i[2]]]
+        elif o == "mul" and ("0" in i[:2]):
+            new = ["add", ["0", "0", i[2]]]
+        elif o == "mul" and ("1" in i[:2]):
+            new = ["add", [i[1] if i[0] == "1" else i[0], "0", i[2]]]
+        elif o == "add" and i[0] == "0" and i[1] != "0":
+            new = ["add", [i[1], "0", i[2]]]
+        elif (o == "jit" or o == "jif") and isint(i[0]):
+            taken = (int(i[0]) != 0) == (o == "jit")
+            to_next = k + 1 < len(instrs) and i[1] in instrs[k + 1][0]
+            if (not taken or to_next) and remove(instrs, k):
+                changed += 1
+                continue
+            if taken and [o, i[0]] != ["jit", "1"]:
+                new = ["jit", ["1", i[1]]]
+
+        if new:
+            instrs[k] = [ls] + new
+            changed += 1
+        k += 1
+    return changed
+
+def is_move(o, i):
+    return o == "add" and i[1] == "0"
+
+# peephole fusion of moves. returns True if anything changed
+def fuse(instrs, pins):
+    live = liveness(instrs)
+    for k in range(len(instrs)):
+        ls, o, i = instrs[k]
+
+        # add x 0 x
+        if is_move(o, i) and i[0] == i[2] and remove(instrs, k):
+            return True
+
+        if k + 1 >= len(instrs) or instrs[k + 1][0]:
+            continue
+        _, o2, i2 = instrs[k + 1]
+
+        # op a b t, add t 0 y => op a b y
+        w = writes(o)
+        if w and is_move(o2, i2):
+            t = i[w[0]]
+            y = i2[2]
+            if is_cell(t) and t not in pins and i2[0] == t and t != y and t not in live[k + 1] \
+                    and accepts(o, w[0], y):
+                instrs[k] = [ls, o, i[:w[0]] + [y] + i[w[0] + 1:]]
+                del instrs[k + 1]
+                return True
+
+        # add x 0 t, op t .. => op x ..
+        if is_move(o, i):
+            x, t = i[0], i[2]
+            rs = [p for p in reads(o2) if i2[p] == t]
+            if is_cell(t) and t not in pins and rs and all(accepts(o2, p, x) for p in rs) \
+                    and (t not in live[k + 1] or t in defs(o2, i2)):
+                instrs[k + 1] = [ls, o2, [x if p in rs else a for p, a in enumerate(i2)]]
+                del instrs[k]
+                return True
+    return False
+
+# remove writes to cells that are never read afterwards
+def dead_stores(instrs, pins):
+    live = liveness(instrs)
+    for k in range(len(instrs)):
+        _, o, i = instrs[k]
+        if o in ("add", "mul", "lt", "eq"):
+            d = i[2]
+            if is_cell(d) and d not in pins and d not in live[k] and remove(instrs, k):
+                return True
+    return False
+
+# let cells share memory when they are never live at the same time, e.g.
+# all the scratch tmp cells
+def reuse(instrs, pins):
+    live = liveness(instrs)
+    interferes = defaultdict(set)
+    for k, (_, o, i) in enumerate(instrs):
+        for d in defs(o, i):
+            for x in live[k]:
+                if x != d:
+                    interferes[d].add(x)
+                    interferes[x].add(d)
+
+    slots = OrderedDict()
+    rename = {}
+    for c in cells(instrs, pins):
+        if c in pins:
+            continue
+        for s, members in slots.items():
+            if not any(m in interferes[c] for m in members):
+                members.append(c)
+                rename[c] = s
+                break
+        else:
+            slots[c] = [c]
+            rename[c] = c
+
+    def cell_args(o, i):
+        ps = reads(o) + writes(o)
+        return [rename.get(x, x) if p in ps else x for p, x in enumerate(i)]
+
+    return [[ls, o, cell_args(o, i)] for ls, o, i in instrs]
+
+# with stats, a Counter, counts how many times each pass fired
+def optimized(instrs, vars, stats=None):
+    instrs = [[list(ls), o, list(i)] for ls, o, i in instrs]
+    pins = pinned(vars)
+    stats = Counter() if stats is None else stats
+    changed = True
+    while changed:
+        changed = fold(instrs)
+        stats["fold"] += changed
+        while fuse(instrs, pins):
+            stats["fuse"] += 1
+            changed = True
+        while dead_stores(instrs, pins):
+            stats["dead store"] += 1
+            changed = True
+    before = ilen(cells(instrs, vars))
+    instrs = reuse(instrs, pins)
+    stats["reuse"] += before - ilen(cells(instrs, vars))
+    return instrs
+
+# sum of i * i for i up to the input, written the way a naive compiler would:
+# every expression goes through its own tmp, and constant expressions are
+# computed at run time
+sample = """
+     add 0 0 t0
+     add t0 0 s
+     inp t1
+     add t1 0 n
+     add 1 0 t2
+     add t2 0 i
+loop:lt n i t3
+     jit t3 done
+     mul i 1 t4
+     add t4 0 t5
+     mul t5 i t6
+     add s t6 t7
+     add t7 0 s
+     mul 2 3 t8
+     add i 1 t9
+     add t9 0 i
+     eq 1 1 t10
+     jit t10 loop
+done:out s
+     ext
+"""
+
+# python3 intasm.py [n]
+#
+# runs sample with and without the optimization passes, showing each of them
+# firing and the number of Intcode steps saved. needs util.py, as in the day
+# directories
+if __name__ == "__main__":
+    from profiler import *
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for optimize in False, True:
+        ic = Intcode(intasm(sample, optimize), lambda: n)
+        ic.profile = Profile()
+        print("optimize=%s: output %s, %s steps" % (optimize, ic.run(), ic.profile.steps()))
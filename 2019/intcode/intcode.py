@@ -1,8 +1,10 @@
 import sys
+from array import array
 from collections import defaultdict
+from copy import copy
 
 def parse(f):
-    return map(int, f.read().strip().split(","))[:]
+    return list(map(int, f.read().strip().split(",")))
 
 def opcode(i):
     if i == 1:
@@ -29,11 +31,75 @@ def opcode(i):
 def digit(number, n):
     return number // 10**n % 10
 
+page_bits = 10
+page_size = 1 << page_bits
+page_mask = page_size - 1
+
+# Paged Intcode memory, unset addresses read as 0. Pages are shared between
+# forks and copied on the first write, so a fork only costs memory for the
+# pages that differ from its parent.
+class Memory:
+    __slots__ = ("pages", "owned")
+
+    def __init__(self, prog=()):
+        # page number -> list of values
+        self.pages = {}
+        # pages not shared with any other fork, safe to write to
+        self.owned = set()
+        for i, p in enumerate(prog):
+            self[i] = p
+
+    def __getitem__(self, addr):
+        page = self.pages.get(addr >> page_bits)
+        return page[addr & page_mask] if page else 0
+
+    def __setitem__(self, addr, value):
+        n = addr >> page_bits
+        if n not in self.owned:
+            page = self.pages.get(n)
+            self.pages[n] = page[:] if page else [0] * page_size
+            self.owned.add(n)
+        self.pages[n][addr & page_mask] = value
+
+    def get(self, addr, default=0):
+        page = self.pages.get(addr >> page_bits)
+        return page[addr & page_mask] if page else default
+
+    def items(self):
+        for n, page in sorted(self.pages.items()):
+            for i, v in enumerate(page):
+                yield (n << page_bits) + i, v
+
+    # all pages are shared after a fork, both this memory and the fork will
+    # copy pages on write
+    def fork(self):
+        m = Memory()
+        m.pages = dict(self.pages)
+        self.owned = set()
+        return m
+
+# lines of memory dump, labelled by the address starting each row. cell(x)
+# gives the text for address x
+def dump(cell, size=1024, major=30, minor=10):
+    s = ""
+    row = 0
+    for x in range(size):
+        if s and x % major == 0:
+            yield "%-5s: %s" % (row, s)
+            row += major
+            s = ""
+        elif s and x % minor == 0:
+            s += ", "
+        s += cell(x)
+    if s:
+        yield "%-5s: %s" % (row, s)
+
 class Intcode:
+    # set to a profiler.Profile to record what the program does
+    profile = None
+
     def __init__(self, prog, inp):
-        self.prog = defaultdict(int)
-        for i, p in enumerate(prog):
-            self.prog[i] = p
+        self.prog = Memory(prog)
 
         self.i = 0
         self.input = inp
@@ -41,7 +107,8 @@ class Intcode:
 
     def run(self, debug=False):
         while True:
-            start_prog = dict(self.prog)
+            if debug:
+                start_prog = self.memory()
             start_i = self.i
             op = self.prog[self.i]
 
@@ -49,17 +116,25 @@ class Intcode:
             modes = [digit(op, x) for x in range(2, 5)]
 
             used_params = []
+            # addresses read and written, only collected when profiling
+            profile = self.profile
+            reads = [] if profile is not None else None
+            writes = [] if profile is not None else None
             def params(inn, out=0):
                 res = []
                 for u in range(inn):
                     pp = self.prog[self.i+u+1]
                     if modes[u] == 0:
                         res.append(self.prog[pp])
+                        if reads is not None:
+                            reads.append(pp)
                     elif modes[u] == 1:
                         res.append(pp)
                     elif modes[u] == 2:
                         x = self.base + pp
                         res.append(self.prog[x])
+                        if reads is not None:
+                            reads.append(x)
                     else:
                         assert False
 
@@ -72,9 +147,13 @@ class Intcode:
                     else:
                         assert False
 
+                if writes is not None:
+                    writes.extend(res[inn:])
                 used_params.extend(res)
                 return res if len(res) > 1 else res[0]
 
+            taken = None
+
             if o == 1: # add
                 a, b, c = params(2, 1)
                 self.prog[c] = a + b
@@ -91,6 +170,8 @@ class Intcode:
             elif o == 4: # output
                 a = params(1)
                 self.i += 2
+                if profile is not None:
+                    profile.record(start_i, o, reads, writes, None)
                 return a
             elif o == 5: # jump if true
                 a, b = params(2)
@@ -98,12 +179,14 @@ class Intcode:
                     self.i = b
                 else:
                     self.i += 3
+                taken = a != 0
             elif o == 6: # jump if false
                 a, b = params(2)
                 if a == 0:
                     self.i = b
                 else:
                     self.i += 3
+                taken = a == 0
             elif o == 7: # less than
                 a, b, c = params(2, 1)
                 self.prog[c] = int(a<b)
@@ -117,37 +200,266 @@ class Intcode:
                 self.base += a
                 self.i += 2
             elif o == 99: # exit
+                if profile is not None:
+                    profile.record(start_i, o, reads, writes, None)
                 return None
             else:
                 assert False, "unknown op %s" % o
 
+            if profile is not None:
+                profile.record(start_i, o, reads, writes, taken)
             if debug:
                 self.halt(start_prog, start_i, op, o, modes, used_params)
 
+    # snapshot of memory as a dict of address -> value
+    def memory(self):
+        return dict(self.prog.items())
+
+    # state of the VM that can later be restore()'d. for Intcode memory
+    # pages are shared with the snapshot until either side writes to them
+    def snapshot(self):
+        return (self.i, self.base, self.prog.fork())
+
+    def restore(self, snapshot):
+        i, base, prog = snapshot
+        self.i = i
+        self.base = base
+        self.prog = prog.fork()
+
+    # new VM in the same state as this one, e.g. for branching in a search.
+    # uses the same input function unless a new one is given
+    def fork(self, inp=None):
+        ic = copy(self)
+        ic.restore(self.snapshot())
+        if inp is not None:
+            ic.input = inp
+        return ic
+
     def halt(self, start_prog, start_i, op, o, modes, used_params):
         print("op: %s, i: %s -> %s, modes: %s, params: %s, base: %s" % (opcode(o), start_i, self.i, modes, used_params, self.base))
 
-        major = 30
-        minor = 10
-        s = ""
-        row = 0
-        for x in range(1024):
+        prog = self.memory()
+
+        def cell(x):
             p1 = start_prog.get(x, 0)
-            p2 = self.prog.get(x, 0)
-            if s and x % major == 0:
-                print("%-5s: %s" % (row, s))
-                row += major
-                s = ""
-            elif s and x % minor == 0:
-                s += ", "
+            p2 = prog.get(x, 0)
             if p1 == p2:
                 if x >= start_i and x <= start_i + len(used_params):
-                    s += "\033[92m%-6s\033[0m" % p2
+                    return "\033[92m%-6s\033[0m" % p2
                 else:
-                    s += "%-6s" % p2
+                    return "%-6s" % p2
+            else:
+                return "\033[91m%s -> %s\033[0m " % (p1, p2)
+
+        for line in dump(cell):
+            print(line)
+
+        input("")
+
+# number of parameters and instruction length per opcode
+op_params = {1: 3, 2: 3, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1, 99: 0}
+
+# code maps each address to the start of the decoded code covering it, as
+# a tuple. these add and remove start for the addresses from start to end,
+# so that code being decoded and invalidated over and over, as in a program
+# patching itself in a loop, doesn't leave a trail behind
+def cover(code, start, end):
+    for x in range(start, end):
+        t = code.get(x, ())
+        if start not in t:
+            code[x] = t + (start,)
+
+def uncover(code, start, end):
+    for x in range(start, end):
+        t = code.get(x)
+        if t is not None and start in t:
+            t = tuple(y for y in t if y != start)
+            if t:
+                code[x] = t
+            else:
+                del code[x]
+
+# values that fit in the memory array
+qmin, qmax = -(1 << 63), (1 << 63) - 1
+
+# Intcode engine that decodes each instruction once and keeps memory in a flat
+# array. Decoded instructions are (opcode, length, m1, p1, m2, p2, m3, p3)
+# tuples, cached by address. A write into a decoded instruction drops it from
+# the cache so that self modifying programs still work.
+#
+# The array holds 64 bit ints. Intcode ints are unbounded, so as soon as a
+# value doesn't fit, in the program or written by it, memory becomes a list
+# instead, which is slower to fork but otherwise the same.
+#
+# Unlike Intcode, nothing is shared between forks: fork() and snapshot()
+# copy all of memory, however little of it either side goes on to write.
+#
+# Same interface as Intcode, run() returns the next output or None on exit.
+class FastIntcode(Intcode):
+    def __init__(self, prog, inp):
+        try:
+            self.mem = array('q', prog)
+        except OverflowError:
+            self.mem = list(prog)
+        self.decoded = {}
+        # address -> start addresses of decoded instructions covering it
+        self.code = {}
+
+        self.i = 0
+        self.input = inp
+        self.base = 0
+
+    def memory(self):
+        return dict(enumerate(self.mem))
+
+    # memory is flat, so snapshots copy it. the copy is a single memcpy, and
+    # decoded instructions are kept since they're still valid for the copy
+    def snapshot(self):
+        return (self.i, self.base, self.mem[:], dict(self.decoded), dict(self.code))
+
+    def restore(self, snapshot):
+        i, base, mem, decoded, code = snapshot
+        self.i = i
+        self.base = base
+        self.mem = mem[:]
+        self.decoded = dict(decoded)
+        self.code = dict(code)
+
+    # take over the state in a snapshot, without copying it
+    def load(self, snapshot):
+        self.i, self.base, self.mem, self.decoded, self.code = snapshot
+
+    # the fork takes over a snapshot, so memory is copied once
+    def fork(self, inp=None):
+        ic = copy(self)
+        ic.load(self.snapshot())
+        if inp is not None:
+            ic.input = inp
+        return ic
+
+    # a value didn't fit in the array, keep memory in a list from now on
+    def widen(self):
+        if not isinstance(self.mem, list):
+            self.mem = list(self.mem)
+        return self.mem
+
+    # make sure addr is within memory, grow by doubling to amortize
+    def grow(self, addr):
+        assert addr >= 0, "negative address %s" % addr
+        n = len(self.mem)
+        if addr >= n:
+            self.mem.extend(array('q', bytes(8 * (max(addr + 1, 2 * n) - n))))
+
+    def decode(self, i):
+        mem = self.mem
+        self.grow(i + 3)
+        op = mem[i]
+        o = op % 100
+        assert o in op_params, "unknown op %s" % o
+        n = op_params[o]
+        d = [o, n + 1]
+        for u in range(3):
+            if u < n:
+                d += [digit(op, u + 2), mem[i + u + 1]]
             else:
-                s += "\033[91m%s -> %s\033[0m " % (p1, p2)
-        if s:
-            print("%-5s: %s" % (row, s))
+                d += [1, 0]
+        d = tuple(d)
 
-        raw_input("")
+        self.decoded[i] = d
+        cover(self.code, i, i + n + 1)
+        return d
+
+    # a write hit decoded code, forget the instructions covering addr
+    def invalidate(self, addr):
+        for x in self.code.pop(addr, ()):
+            d = self.decoded.pop(x, None)
+            if d is not None:
+                uncover(self.code, x, x + d[1])
+
+    def run(self, debug=False):
+        mem = self.mem
+        decoded = self.decoded
+        code = self.code
+        i = self.i
+        base = self.base
+
+        while True:
+            d = decoded.get(i)
+            if d is None:
+                d = self.decode(i)
+            o, n, m1, p1, m2, p2, m3, p3 = d
+
+            if debug:
+                start_prog = self.memory()
+                start_i = i
+
+            try:
+                if o == 1 or o == 2 or o == 7 or o == 8:
+                    a = p1 if m1 == 1 else mem[p1 if m1 == 0 else base + p1]
+                    b = p2 if m2 == 1 else mem[p2 if m2 == 0 else base + p2]
+                    c = p3 if m3 == 0 else base + p3
+                    if o == 1:
+                        mem[c] = a + b
+                    elif o == 2:
+                        mem[c] = a * b
+                    elif o == 7:
+                        mem[c] = int(a < b)
+                    else:
+                        mem[c] = int(a == b)
+                    if c in code:
+                        self.invalidate(c)
+                    i += 4
+                elif o == 5:
+                    a = p1 if m1 == 1 else mem[p1 if m1 == 0 else base + p1]
+                    if a != 0:
+                        i = p2 if m2 == 1 else mem[p2 if m2 == 0 else base + p2]
+                    else:
+                        i += 3
+                elif o == 6:
+                    a = p1 if m1 == 1 else mem[p1 if m1 == 0 else base + p1]
+                    if a == 0:
+                        i = p2 if m2 == 1 else mem[p2 if m2 == 0 else base + p2]
+                    else:
+                        i += 3
+                elif o == 4:
+                    a = p1 if m1 == 1 else mem[p1 if m1 == 0 else base + p1]
+                    self.i = i + 2
+                    self.base = base
+                    return a
+                elif o == 9:
+                    base += p1 if m1 == 1 else mem[p1 if m1 == 0 else base + p1]
+                    i += 2
+                elif o == 3:
+                    c = p1 if m1 == 0 else base + p1
+                    self.grow(c)
+                    # keep state in sync, input() might not return
+                    self.i = i
+                    self.base = base
+                    x = self.input()
+                    if not qmin <= x <= qmax:
+                        mem = self.widen()
+                    mem[c] = x
+                    if c in code:
+                        self.invalidate(c)
+                    i += 2
+                else: # 99, exit
+                    self.i = i
+                    self.base = base
+                    return None
+            except IndexError:
+                # touched memory outside the array, grow and retry
+                # the instruction. nothing has been changed yet at this point
+                self.grow(max(p if m == 0 else base + p
+                              for m, p in ((m1, p1), (m2, p2), (m3, p3))
+                              if m != 1))
+                continue
+            except OverflowError:
+                # the result didn't fit, nothing was written, so widen and
+                # retry the instruction
+                mem = self.widen()
+                continue
+
+            if debug:
+                self.i = i
+                self.base = base
+                self.halt(start_prog, start_i, mem[start_i], o, [m1, m2, m3][:n-1], [p1, p2, p3][:n-1])
@@ -0,0 +1,323 @@
+from intcode import *
+
+# Compiling Intcode engine. Straight line code between jumps is turned into a
+# Python function per basic block, with all parameter modes resolved at
+# compile time. Anything that can't be compiled (input, code that has been
+# written to, unknown ops) runs through the FastIntcode interpreter.
+
+# what a compiled block returns, as (next ip, base, kind, value)
+JUMP = 0
+OUT = 1
+EXIT = 2
+HIT = 3  # wrote to compiled code at address value
+GROW = 4 # memory needs to be grown to cover address value
+
+# ops that end a basic block
+terminators = (4, 5, 6, 9, 99)
+
+# compiled blocks shared between instances running the same program, as
+# program -> (leaders, blocks, code, dirty)
+cache = {}
+
+# find the start of all basic blocks reachable from address 0. follows both
+# branches of jumps with immediate targets, computed jumps will be discovered
+# when run
+def leaders(prog):
+    result = set([0])
+    q = [0]
+    seen = set()
+    while q:
+        i = q.pop()
+        while 0 <= i < len(prog) and i not in seen:
+            seen.add(i)
+            o = prog[i] % 100
+            if o not in op_params:
+                break
+            n = op_params[o]
+            if o == 99:
+                break
+            if o == 5 or o == 6:
+                if digit(prog[i], 3) == 1 and i + 2 < len(prog):
+                    t = prog[i + 2]
+                    result.add(t)
+                    q.append(t)
+                result.add(i + 3)
+            i += n + 1
+    return result
+
+class JitIntcode(FastIntcode):
+    def __init__(self, prog, inp):
+        FastIntcode.__init__(self, prog, inp)
+        self.orig = prog
+
+        key = tuple(prog)
+        if key not in cache:
+            cache[key] = (leaders(prog), {}, {}, set())
+        self.leaders, self.shared, self.shared_code, self.dirty = cache[key]
+
+        # start -> compiled function, or False if it can't be compiled
+        self.blocks = dict(self.shared)
+        self.code = dict(self.shared_code)
+
+    def snapshot(self):
+        return FastIntcode.snapshot(self) + (dict(self.blocks),)
+
+    def restore(self, snapshot):
+        FastIntcode.restore(self, snapshot[:-1])
+        self.blocks = dict(snapshot[-1])
+
+    def load(self, snapshot):
+        FastIntcode.load(self, snapshot[:-1])
+        self.blocks = snapshot[-1]
+
+    # a write hit compiled code. the address is marked as dirty, which is
+    # shared with all instances of the same program, so that it's always
+    # interpreted from now on. programs tend to patch the same addresses on
+    # every run
+    def invalidate(self, addr):
+        for x in self.code.pop(addr, ()):
+            d = self.decoded.pop(x, None)
+            f = self.blocks.pop(x, None)
+            uncover(self.code, x, max(x + d[1] if d else x, f.end if f else x))
+            g = self.shared.pop(x, None)
+            if g:
+                uncover(self.shared_code, x, g.end)
+        self.shared_code.pop(addr, None)
+        self.dirty.add(addr)
+
+    # generate the source of the basic block starting at s. returns None if
+    # nothing can be compiled at s, or (source, end, lines), where lines has
+    # the (address, base delta) of the instruction of each line of the source
+    def source(self, s):
+        mem = self.mem
+        out = []
+        lines = []
+        pos = []
+        rel = []
+
+        # relative base changes by immediate amounts are tracked here at
+        # compile time, and only applied to base when leaving the block
+        delta = [0]
+
+        def bexpr():
+            return "base + %d" % delta[0] if delta[0] else "base"
+
+        def read(m, p):
+            if m == 0:
+                pos.append(p)
+                return "mem[%d]" % p
+            elif m == 1:
+                return "%d" % p
+            else:
+                rel.append(delta[0] + p)
+                return "mem[base + %d]" % (delta[0] + p)
+
+        def write(m, p, expr, nxt):
+            if m == 0:
+                pos.append(p)
+                out.append("    mem[%d] = %s" % (p, expr))
+                out.append("    if %d in code: return %d, %s, HIT, %d" % (p, nxt, bexpr(), p))
+            else:
+                rel.append(delta[0] + p)
+                out.append("    c = base + %d" % (delta[0] + p))
+                out.append("    mem[c] = %s" % expr)
+                out.append("    if c in code: return %d, %s, HIT, c" % (nxt, bexpr()))
+
+        def leave(target, kind="JUMP", value="0"):
+            out.append("    return %s, %s, %s, %s" % (target, bexpr(), kind, value))
+
+        i = s
+        end = None
+        while True:
+            if i != s and i in self.leaders:
+                leave(i)
+                end = i
+                break
+
+            self.grow(i + 3)
+            op = mem[i]
+            o = op % 100
+            if o not in op_params or o == 3:
+                if i == s:
+                    return None
+                leave(i)
+                end = i
+                break
+            n = op_params[o]
+            if any(x in self.dirty for x in range(i, i + n + 1)):
+                if i == s:
+                    return None
+                leave(i)
+                end = i
+                break
+
+            ms = [digit(op, u + 2) for u in range(n)]
+            ps = [mem[i + u + 1] for u in range(n)]
+            nxt = i + n + 1
+            at = (i, delta[0])
+
+            if o in (1, 2, 7, 8):
+                a, b = read(ms[0], ps[0]), read(ms[1], ps[1])
+                expr = {1: "%s + %s", 2: "%s * %s", 7: "int(%s < %s)", 8: "int(%s == %s)"}[o] % (a, b)
+                write(ms[2], ps[2], expr, nxt)
+            elif o == 4:
+                leave(nxt, "OUT", read(ms[0], ps[0]))
+            elif o == 5 or o == 6:
+                a, b = read(ms[0], ps[0]), read(ms[1], ps[1])
+                if ms[0] == 1:
+                    # constant condition, e.g. an unconditional jump
+                    if (ps[0] != 0) == (o == 5):
+                        leave(b)
+                    else:
+                        leave(nxt)
+                else:
+                    out.append("    if %s %s 0: return %s, %s, JUMP, 0" % (a, "!=" if o == 5 else "==", b, bexpr()))
+                    leave(nxt)
+            elif o == 9 and ms[0] == 1:
+                delta[0] += ps[0]
+            elif o == 9:
+                out.append("    return %d, %s + %s, JUMP, 0" % (nxt, bexpr(), read(ms[0], ps[0])))
+            elif o == 99:
+                leave(i, "EXIT")
+
+            lines += [at] * (len(out) - len(lines))
+            if o in terminators and not (o == 9 and ms[0] == 1):
+                end = nxt
+                break
+            i = nxt
+
+        # base only changes by known amounts within a block, so all memory
+        # accesses can be bounds checked up front
+        head = ["def block(mem, base, code, n):"]
+        if pos:
+            head.append("    if %d >= n: return %d, base, GROW, %d" % (max(pos), s, max(pos)))
+        if rel:
+            head.append("    if base + %d >= n: return %d, base, GROW, base + %d" % (max(rel), s, max(rel)))
+        lines = [None] * len(head) + lines + [None] * (len(out) - len(lines))
+        return "\n".join(head + out) + "\n", end, lines
+
+    def compile(self, s):
+        src = self.source(s)
+        if src is None:
+            self.blocks[s] = False
+            if self.mem[s] == self.orig[s]:
+                self.shared[s] = False
+            return False
+        src, end, lines = src
+
+        env = {"JUMP": JUMP, "OUT": OUT, "EXIT": EXIT, "HIT": HIT, "GROW": GROW}
+        exec(compile(src, "<intcode block %d>" % s, "exec"), env)
+        f = env["block"]
+        f.lines = lines
+        f.end = end
+
+        self.blocks[s] = f
+        cover(self.code, s, end)
+
+        # only share code that is still what the program started out with
+        if list(self.mem[s:end]) == list(self.orig[s:end]):
+            self.shared[s] = f
+            cover(self.shared_code, s, end)
+        return f
+
+    # interpret a single instruction, returns (kind, value)
+    def step(self):
+        i = self.i
+        d = self.decoded.get(i)
+        if d is None:
+            d = self.decode(i)
+        o, n = d[0], d[1]
+        ms, ps = d[2:2*n:2], d[3:2*n:2]
+
+        addrs = [p if m == 0 else self.base + p for m, p in zip(ms, ps) if m != 1]
+        if addrs:
+            self.grow(max(addrs))
+
+        mem = self.mem
+        vals = [p if m == 1 else mem[p if m == 0 else self.base + p] for m, p in zip(ms, ps)]
+        dst = None
+        if o in (1, 2, 3, 7, 8):
+            dst = ps[-1] if ms[-1] == 0 else self.base + ps[-1]
+
+        if o in (1, 2, 7, 8):
+            a, b = vals[0], vals[1]
+            x = {1: a + b, 2: a * b, 7: int(a < b), 8: int(a == b)}[o]
+            if not qmin <= x <= qmax:
+                mem = self.widen()
+            mem[dst] = x
+            self.i += 4
+        elif o == 3:
+            x = self.input()
+            if not qmin <= x <= qmax:
+                mem = self.widen()
+            mem[dst] = x
+            self.i += 2
+        elif o == 4:
+            self.i += 2
+            return OUT, vals[0]
+        elif o == 5 or o == 6:
+            if (vals[0] != 0) == (o == 5):
+                self.i = vals[1]
+            else:
+                self.i += 3
+        elif o == 9:
+            self.base += vals[0]
+            self.i += 2
+        else:
+            return EXIT, None
+
+        if dst is not None and dst in self.code:
+            self.invalidate(dst)
+        return JUMP, None
+
+    def run(self, debug=False):
+        if debug:
+            return FastIntcode.run(self, debug)
+
+        mem = self.mem
+        code = self.code
+        blocks = self.blocks
+        i = self.i
+        base = self.base
+
+        while True:
+            f = blocks.get(i)
+            if f is None:
+                f = self.compile(i)
+
+            if f:
+                try:
+                    i, base, kind, v = f(mem, base, code, len(mem))
+                except OverflowError as e:
+                    # a write in the block didn't fit. the writes before it
+                    # are done, so carry on from the instruction that failed,
+                    # with memory widened
+                    tb = e.__traceback__
+                    while tb.tb_next:
+                        tb = tb.tb_next
+                    i, delta = f.lines[tb.tb_lineno - 1]
+                    base += delta
+                    mem = self.widen()
+                    continue
+                if kind == HIT:
+                    self.invalidate(v)
+                    continue
+                elif kind == GROW:
+                    self.grow(v)
+                    continue
+            else:
+                self.i = i
+                self.base = base
+                kind, v = self.step()
+                mem = self.mem
+                i = self.i
+                base = self.base
+
+            if kind == OUT:
+                self.i = i
+                self.base = base
+                return v
+            elif kind == EXIT:
+                self.i = i
+                self.base = base
+                return None
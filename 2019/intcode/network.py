@@ -0,0 +1,185 @@
+from collections import deque
+from multiprocessing import Pipe, Process
+from intcode import *
+
+# Scheduler for a network of Intcode NICs, as in 2019 day 23. Each NIC first
+# reads its address, then packets as x, y pairs, or -1 if none is waiting.
+# Packets are sent as three outputs: destination, x, y. Packets sent to 255
+# go to the NAT, which wakes up NIC 0 with the last packet it got when the
+# network goes idle.
+#
+# A NIC runs until it blocks on input. It gets a single -1 when its queue is
+# empty, reading from an empty queue a second time suspends it until a packet
+# arrives. The network is idle exactly when no NIC can run.
+#
+# for event, x, y in Network(prog).run():
+#     event is "nat" for each packet sent to the NAT, and "idle" when the NAT
+#     wakes up the network
+
+nat = 255
+
+# raised from the input function to suspend a VM
+class Blocked(Exception):
+    pass
+
+# a group of NICs run in this process
+class Hosts:
+    def __init__(self, prog, addrs, engine=FastIntcode):
+        self.queues = {}
+        self.misses = {}
+        self.vms = {}
+        self.outputs = {}
+        for addr in addrs:
+            self.queues[addr] = deque([addr])
+            self.misses[addr] = 0
+            self.vms[addr] = engine(prog, self.reader(addr))
+            self.outputs[addr] = []
+
+        self.runnable = deque(addrs)
+        self.waiting = set()
+        # packets for NICs not in this group
+        self.outbox = []
+        self.packets = []
+
+    def reader(self, addr):
+        q = self.queues[addr]
+        misses = self.misses
+
+        def read():
+            if q:
+                misses[addr] = 0
+                return q.popleft()
+            if misses[addr] == 0:
+                misses[addr] = 1
+                return -1
+            raise Blocked()
+        return read
+
+    def send(self, dest, x, y):
+        if dest in self.queues:
+            self.queues[dest].extend((x, y))
+            if dest in self.waiting:
+                self.waiting.remove(dest)
+                self.runnable.append(dest)
+        else:
+            self.outbox.append((dest, x, y))
+
+    # run a NIC until it blocks or halts
+    def resume(self, addr):
+        ic = self.vms[addr]
+        out = self.outputs[addr]
+        try:
+            while True:
+                v = ic.run()
+                if v is None:
+                    return
+                out.append(v)
+                if len(out) == 3:
+                    self.send(*out)
+                    del out[:]
+        except Blocked:
+            self.waiting.add(addr)
+
+    def start(self, packets):
+        self.packets = packets
+
+    # deliver packets and run until all NICs block. if eager, return as soon
+    # as a packet leaves the group. returns (outgoing packets, idle)
+    def wait(self, eager=False):
+        for p in self.packets:
+            self.send(*p)
+        self.packets = []
+
+        while self.runnable and not (eager and self.outbox):
+            self.resume(self.runnable.popleft())
+
+        out = self.outbox
+        self.outbox = []
+        return out, not self.runnable
+
+    def close(self):
+        pass
+
+def serve(conn, prog, addrs, engine):
+    hosts = Hosts(prog, addrs, engine)
+    while True:
+        packets = conn.recv()
+        if packets is None:
+            break
+        hosts.start(packets)
+        conn.send(hosts.wait())
+
+# a group of NICs run in a separate process
+class RemoteHosts:
+    def __init__(self, prog, addrs, engine=FastIntcode):
+        self.conn, child = Pipe()
+        self.process = Process(target=serve, args=(child, prog, addrs, engine), daemon=True)
+        self.process.start()
+
+    def start(self, packets):
+        self.conn.send(packets)
+
+    def wait(self, eager=False):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.send(None)
+        self.process.join()
+
+class Network:
+    # with processes, NICs are split evenly over that many worker processes
+    def __init__(self, prog, size=50, engine=FastIntcode, processes=None):
+        addrs = list(range(size))
+        if processes:
+            groups = [addrs[i::processes] for i in range(processes)]
+            self.hosts = [RemoteHosts(prog, g, engine) for g in groups]
+        else:
+            groups = [addrs]
+            self.hosts = [Hosts(prog, addrs, engine)]
+
+        self.host = {}
+        for h, g in zip(self.hosts, groups):
+            for addr in g:
+                self.host[addr] = h
+
+    # generator of (event, x, y), see above. stops if the network goes idle
+    # before the NAT has received anything
+    def run(self):
+        eager = len(self.hosts) == 1
+        last = None
+        pending = {h: [] for h in self.hosts}
+        active = list(self.hosts)
+
+        try:
+            while True:
+                for h in active:
+                    h.start(pending[h])
+                    pending[h] = []
+
+                out = []
+                busy = set()
+                for h in active:
+                    packets, idle = h.wait(eager)
+                    out += packets
+                    if not idle:
+                        busy.add(h)
+
+                for dest, x, y in out:
+                    if dest == nat:
+                        last = (x, y)
+                        yield "nat", x, y
+                    elif dest in self.host:
+                        pending[self.host[dest]].append((dest, x, y))
+
+                active = [h for h in self.hosts if h in busy or pending[h]]
+                if not active:
+                    if last is None:
+                        return
+                    x, y = last
+                    yield "idle", x, y
+                    h = self.host[0]
+                    pending[h].append((0, x, y))
+                    active = [h]
+        finally:
+            for h in self.hosts:
+                h.close()
@@ -0,0 +1,124 @@
+import json
+from collections import Counter, defaultdict
+from intcode import *
+
+# Execution profile of an Intcode program. Enable by setting the profile of
+# an Intcode (the plain interpreter) before running it:
+#
+# ic = Intcode(prog, inp)
+# ic.profile = Profile()
+# ... ic.run() ...
+# print(ic.profile.report())
+
+class Profile:
+    def __init__(self):
+        # address -> times executed
+        self.executed = Counter()
+        # op name -> times executed
+        self.ops = Counter()
+        # address -> times read/written as a parameter
+        self.reads = Counter()
+        self.writes = Counter()
+        # address of jump -> [taken, not taken]
+        self.branches = defaultdict(lambda: [0, 0])
+        # (from, to) -> times the ip moved backwards, i.e. looped
+        self.back_edges = Counter()
+        self.last = None
+
+    def record(self, i, o, reads, writes, taken=None):
+        self.executed[i] += 1
+        self.ops[opcode(o) if o != 99 else "exit"] += 1
+        for a in reads:
+            self.reads[a] += 1
+        for a in writes:
+            self.writes[a] += 1
+        if taken is not None:
+            self.branches[i][0 if taken else 1] += 1
+
+        if self.last is not None and i <= self.last:
+            self.back_edges[(self.last, i)] += 1
+        self.last = i
+
+    def steps(self):
+        return sum(self.executed.values())
+
+    # loops as (start, end, iterations, instructions executed within the loop
+    # body), most expensive first
+    def loops(self):
+        result = []
+        for (end, start), n in self.back_edges.items():
+            cost = sum(c for a, c in self.executed.items() if start <= a <= end)
+            result.append((start, end, n, cost))
+        return sorted(result, key=lambda l: -l[3])
+
+    def to_dict(self):
+        return {
+            "steps": self.steps(),
+            "executed": {str(a): n for a, n in sorted(self.executed.items())},
+            "ops": dict(self.ops.most_common()),
+            "reads": {str(a): n for a, n in sorted(self.reads.items())},
+            "writes": {str(a): n for a, n in sorted(self.writes.items())},
+            "branches": {str(a): {"taken": t, "not_taken": nt} for a, (t, nt) in sorted(self.branches.items())},
+            "loops": [{"start": s, "end": e, "iterations": n, "steps": c} for s, e, n, c in self.loops()],
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    # text report, with memory dumps coloured by how hot each address is
+    def report(self, top=10):
+        steps = self.steps()
+        lines = ["steps: %s" % steps, "", "ops:"]
+        for name, n in self.ops.most_common():
+            lines.append("  %-14s %10s %5.1f%%" % (name, n, 100.0 * n / steps))
+
+        lines += ["", "hot instructions:"]
+        for a, n in self.executed.most_common(top):
+            lines.append("  %-6s %10s %5.1f%%" % (a, n, 100.0 * n / steps))
+
+        lines += ["", "loops:"]
+        for s, e, n, c in self.loops()[:top]:
+            lines.append("  %s-%s: %s iterations, %s steps %5.1f%%" % (s, e, n, c, 100.0 * c / steps))
+
+        lines += ["", "branches (taken/not taken):"]
+        hot = sorted(self.branches.items(), key=lambda b: -sum(b[1]))[:top]
+        for a, (t, nt) in hot:
+            lines.append("  %-6s %10s %10s" % (a, t, nt))
+
+        touched = list(self.executed) + list(self.reads) + list(self.writes)
+        size = max(touched) + 1 if touched else 0
+        for name, counts in [("executed", self.executed), ("reads", self.reads), ("writes", self.writes)]:
+            lines += ["", "%s:" % name]
+            lines += dump(heat(counts), size)
+
+        return "\n".join(lines)
+
+# colour counts by how they compare to the largest count
+def heat(counts):
+    m = max(counts.values()) if counts else 0
+
+    def cell(x):
+        n = counts.get(x, 0)
+        if not n:
+            return "%-6s" % "."
+        elif n * 100 >= m:
+            return "\033[91m%-6s\033[0m" % n
+        elif n * 10000 >= m:
+            return "\033[93m%-6s\033[0m" % n
+        else:
+            return "\033[92m%-6s\033[0m" % n
+    return cell
+
+# run prog to completion with a list of inputs, returns (outputs, profile)
+def profile(prog, inputs=()):
+    inp = iter(inputs)
+    ic = Intcode(prog, lambda: next(inp))
+    ic.profile = Profile()
+
+    out = []
+    while True:
+        o = ic.run()
+        if o is None:
+            break
+        out.append(o)
+    return out, ic.profile
@@ -0,0 +1,84 @@
+from util import *
+
+# Handheld game console boot code, as in day 8: acc, jmp and nop, where the
+# program terminates by getting to the instruction after the last one
+
+def parse(f):
+    return [intify(line.split()) for line in f if line.strip()]
+
+flipped = {"jmp": "nop", "nop": "jmp"}
+
+# the next ip after the instruction at ip. anywhere outside the program
+# counts as the end, len(prog)
+def successor(prog, ip, op=None):
+    o, x = prog[ip]
+    o = op or o
+    nxt = ip + x if o == "jmp" else ip + 1
+    return nxt if 0 <= nxt < len(prog) else len(prog)
+
+# run until the program terminates or is about to run an instruction a
+# second time. returns (acc, terminated)
+def run(prog):
+    acc = 0
+    ip = 0
+    seen = bytearray(len(prog))
+    while ip < len(prog) and not seen[ip]:
+        seen[ip] = 1
+        o, x = prog[ip]
+        if o == "acc":
+            acc += x
+        ip = successor(prog, ip)
+    return acc, ip == len(prog)
+
+# the control flow graph, as the next ip of each instruction as it is,
+# and if flipped (None for acc)
+def graph(prog):
+    n = len(prog)
+    succ = [ip + x if o == "jmp" else ip + 1 for ip, (o, x) in enumerate(prog)]
+    alt = [ip + 1 if o == "jmp" else ip + x if o == "nop" else None for ip, (o, x) in enumerate(prog)]
+    succ = [x if 0 <= x < n else n for x in succ]
+    alt = [x if x is None or 0 <= x < n else n for x in alt]
+    return succ, alt
+
+# the instructions from which the program terminates, as a bytearray of
+# flags, found by walking the control flow graph backwards from the end
+def terminating(succ):
+    n = len(succ)
+    preds = [[] for _ in range(n + 1)]
+    for ip, nxt in enumerate(succ):
+        preds[nxt].append(ip)
+
+    result = bytearray(n + 1)
+    result[n] = 1
+    q = [n]
+    while q:
+        for ip in preds[q.pop()]:
+            if not result[ip]:
+                result[ip] = 1
+                q.append(ip)
+    return result
+
+# the ip of the single jmp or nop that, flipped, makes the program
+# terminate, or None. the instruction must be on the path the program takes,
+# and flipping it must lead to an instruction that terminates
+def repair(prog):
+    succ, alt = graph(prog)
+    ends = terminating(succ)
+    n = len(prog)
+    ip = 0
+    seen = bytearray(n)
+    while ip < n and not seen[ip]:
+        seen[ip] = 1
+        if alt[ip] is not None and ends[alt[ip]]:
+            return ip
+        ip = succ[ip]
+    return None
+
+def repaired(prog):
+    ip = repair(prog)
+    if ip is None:
+        return prog
+    prog = prog[:]
+    o, x = prog[ip]
+    prog[ip] = [flipped[o], x]
+    return prog
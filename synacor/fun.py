@@ -1,27 +1,105 @@
 import sys
-sys.setrecursionlimit(15000)
-from functools import cache
+from multiprocessing import Pool, cpu_count
 
-# this script doesn't work as it runs out of recursion depth, see fun.rs instead
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-@cache
-def fun(a, b, c):
-    print(a, b, c)
+# The teleporter check (the call at 5489) runs this function, with c in r7:
+#
+# fun(a, b, c):
+#     if a == 0: return b + 1
+#     if b == 0: return fun(a - 1, c, c)
+#     return fun(a - 1, fun(a, b - 1, c), c)
+#
+# and wants fun(4, 1, c) == 6, everything modulo 32768.
+#
+# Instead of recursing, compute it bottom up a row at a time, where row a is
+# fun(a, b, c) for all b:
+#
+# row[0][b] = b + 1
+# row[a][0] = row[a - 1][c]
+# row[a][b] = row[a - 1][row[a][b - 1]]
+#
+# python3 fun.py [processes]
+
+M = 32768
+
+# row a - 1 for a given c, as a list over all b
+def prev_row(a, c):
+    row = [(b + 1) % M for b in range(M)]
+    for _ in range(a - 1):
+        prev = row
+        row = [0] * M
+        x = prev[c]
+        row[0] = x
+        for b in range(1, M):
+            x = prev[x]
+            row[b] = x
+    return row
 
+def fun(a, b, c):
     if a == 0:
-        return b + 1
-    else:
-        if b == 0:
-            return fun(a - 1, c, c)
-        else:
-            x = fun(a, b - 1, c)
-            return fun(a - 1, x, c)
+        return (b + 1) % M
+    prev = prev_row(a, c)
+    x = prev[c]
+    for _ in range(b):
+        x = prev[x]
+    return x
+
+# same as prev_row, but for many values of c at once. returns a flat array
+# of rows of shape (M, len(cs)), that is, fun(a - 1, b, cs[i]) is at
+# b * len(cs) + i. laid out this way, each step of the row writes one
+# contiguous slice
+def prev_rows(a, cs):
+    k = len(cs)
+    ix = np.arange(k)
+    idx = np.empty(k, dtype=np.int64)
+    row = np.repeat(((np.arange(M) + 1) % M)[:, None], k, axis=1).astype(np.uint16)
+    for _ in range(a - 1):
+        prev = row.ravel()
+        row = np.empty((M, k), dtype=np.uint16)
+        np.copyto(idx, cs)
+        idx *= k
+        idx += ix
+        x = prev.take(idx)
+        row[0] = x
+        for b in range(1, M):
+            np.copyto(idx, x)
+            idx *= k
+            idx += ix
+            x = prev.take(idx)
+            row[b] = x
+    return row.ravel()
+
+# values of c in cs where fun(a, b, c) == target
+def search(args):
+    a, b, cs, target = args
+    if np is None or a == 0:
+        return [c for c in cs if fun(a, b, c) == target]
 
+    cs = np.array(cs, dtype=np.int64)
+    prev = prev_rows(a, cs)
+    k = len(cs)
+    ix = np.arange(k)
+    x = prev.take(cs * k + ix).astype(np.int64)
+    for _ in range(b):
+        x = prev.take(x * k + ix).astype(np.int64)
+    return [int(c) for c in cs[x == target]]
 
-a = 4
-b = 1
-c = 4
+# search all c, in chunks spread over a process pool. returns the first
+# (lowest) match, or None
+def solve(a=4, b=1, target=6, processes=None, chunk=1024):
+    chunks = [(a, b, list(range(i, min(i + chunk, M))), target) for i in range(0, M, chunk)]
+    with Pool(processes or cpu_count()) as pool:
+        for found in pool.imap(search, chunks):
+            if found:
+                return found[0]
+    return None
 
-x = fun(a, b, c)
+if __name__ == "__main__":
+    assert fun(4, 1, 25734) == 6
 
-print(x)
\ No newline at end of file
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(solve(processes=processes))
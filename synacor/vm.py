@@ -1,37 +1,413 @@
 import sys
+import mmap
+import struct
+from array import array
 from collections import *
 from itertools import *
 
-with open("challenge.bin", "rb") as f:
-    data = f.read()
+# load a binary, each number is a 16-bit little-endian pair
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
 
-mem = [0] * pow(2, 15)
-regs = [0] * 8
-stack = []
+    mem = [0] * pow(2, 15)
+    for i in range(0, len(data), 2):
+        a, b = data[i], data[i+1]
+        x = (b << 8) + a
 
-for i in range(0, len(data), 2):
-    a, b = data[i], data[i+1]
-    x = (b << 8) + a
+        mem[i//2] = x
+    return mem
 
-    mem[i//2] = x
+def reg(x):
+    return x - 32768
 
-def read(x):
-    if 0 <= x <= 32767:
-        return x
-    elif 32768 <= x <= 32775:
+# name and number of operands for each op
+ops = [
+    ("halt", 0),
+    ("set", 2),
+    ("push", 1),
+    ("pop", 1),
+    ("eq", 3),
+    ("gt", 3),
+    ("jmp", 1),
+    ("jt", 2),
+    ("jf", 2),
+    ("add", 3),
+    ("mult", 3),
+    ("mod", 3),
+    ("and", 3),
+    ("or", 3),
+    ("not", 2),
+    ("rmem", 2),
+    ("wmem", 2),
+    ("call", 1),
+    ("ret", 0),
+    ("out", 1),
+    ("in", 1),
+    ("noop", 0),
+]
+
+# operand kinds
+LIT, REG = 0, 1
+
+def kind(x):
+    if x <= 32767:
+        return LIT
+    elif x <= 32775:
+        return REG
+    return None
+
+# op of addresses that don't hold a valid instruction
+INVALID = len(ops)
+
+# Decoded instructions for every address in memory, whether it's code or
+# not, as (op, operands, operand kinds). jumps can land anywhere, so all
+# addresses are decoded up front. writes must go through write(), which
+# re-decodes the instructions overlapping the written address
+class Decoder:
+    def __init__(self, mem):
+        self.mem = mem
+        self.table = [self.decode(ip) for ip in range(len(mem))]
+
+    def decode(self, ip):
+        mem = self.mem
+        op = mem[ip]
+        if op < INVALID:
+            n = ops[op][1]
+            args = tuple(mem[ip + 1:ip + 1 + n])
+            kinds = tuple(map(kind, args))
+            if len(args) == n and None not in kinds:
+                return op, args, kinds
+        return INVALID, (), ()
+
+    def write(self, addr, value):
+        self.mem[addr] = value
+        table = self.table
+        for ip in range(max(0, addr - 3), addr + 1):
+            table[ip] = self.decode(ip)
+
+# format an instruction. with registers, as for an executed instruction,
+# they are shown with the value they had before the instruction ran
+def format_instr(ip, op, args, regs=None):
+    def rr(x):
+        if kind(x) != REG:
+            return str(x)
+        elif regs is None:
+            return "r%s" % reg(x)
+        else:
+            return "r%s(%s)" % (reg(x), regs[reg(x)])
+    return "%s: %s %s" % (ip, ops[op][0], ", ".join(map(rr, args)))
+
+# Tracers, called with (ip, op, operands, registers) before each instruction
+# is executed
+
+# keeps the last n instructions in memory
+class RingTrace:
+    def __init__(self, n=10000):
+        self.buf = deque(maxlen=n)
+
+    def __call__(self, ip, op, args, regs):
+        self.buf.append((ip, op, args, tuple(regs)))
+
+    def lines(self):
+        return [format_instr(*t) for t in self.buf]
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for line in self.lines():
+                f.write(line + "\n")
+
+    def close(self):
+        pass
+
+# writes all instructions to a file, in batches of lines
+class FileTrace:
+    def __init__(self, path, batch=100000):
+        self.f = open(path, "w")
+        self.batch = batch
+        self.buf = []
+
+    def __call__(self, ip, op, args, regs):
+        self.buf.append(format_instr(ip, op, args, regs))
+        if len(self.buf) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        self.f.write("\n".join(self.buf) + "\n" if self.buf else "")
+        self.buf = []
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+# Snapshot file format, all little-endian 16-bit words except the header:
+# header: magic, ip, stack size, input size in bytes
+# memory (32768 words), registers (8 words), stack, pending input as utf-8
+# padded to an even length
+snapshot_header = struct.Struct("<4sHII")
+snapshot_magic = b"SYN1"
+
+# restore a VM saved with VM.save. memory is memory mapped from the file,
+# copy on write, so restoring doesn't copy the image, and only pages written
+# to get copied later. the VM still reads all of it once, when its Decoder
+# decodes every address
+def restore(path, trace=None):
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, ip, nstack, ninp = snapshot_header.unpack_from(mm, 0)
+    assert magic == snapshot_magic, "not a snapshot: %s" % path
+
+    off = snapshot_header.size // 2
+    if sys.byteorder == "little":
+        words = memoryview(mm).cast("H")
+    else:
+        # an array can't be built from a mmap directly
+        words = array("H")
+        words.frombytes(mm)
+        words.byteswap()
+
+    mem = words[off:off + 32768]
+    off += 32768
+    regs = list(words[off:off + 8])
+    off += 8
+    stack = list(words[off:off + nstack])
+    off += nstack
+    inp = bytes(mm[off * 2:off * 2 + ninp]).decode("utf-8")
+
+    vm = VM(mem, inp, trace)
+    vm.ip = ip
+    vm.regs = regs
+    vm.stack = stack
+    return vm
+
+class VM:
+    def __init__(self, mem, inp="", trace=None):
+        self.mem = mem
+        self.decoder = Decoder(mem)
+        self.regs = [0] * 8
+        self.stack = []
+        self.ip = 0
+        # prepared input, once it runs out input is read from stdin
+        self.inp = inp
+        self.trace = trace
+
+        self.handlers = [
+            self.halt,
+            self.set,
+            self.push,
+            self.pop,
+            self.eq,
+            self.gt,
+            self.jmp,
+            self.jt,
+            self.jf,
+            self.add,
+            self.mult,
+            self.mod,
+            self.and_,
+            self.or_,
+            self.not_,
+            self.rmem,
+            self.wmem,
+            self.call,
+            self.ret,
+            self.out,
+            self.in_,
+            self.noop,
+            self.invalid,
+        ]
+
+    # value of operand x. register 7 is special cased for the teleporter, so
+    # handlers read other registers directly
+    def read(self, x, ip):
+        if x <= 32767:
+            return x
         r = x - 32768
         if r == 7:
             if ip > 600: # skip self test
+                write = self.decoder.write
                 # patch memory
-                mem[5485] = 6 # set value of r0 to the expected output of the recursive function
-                mem[5489] = 21 # nop to skip call to recursive function
-                mem[5490] = 21 # as above
+                write(5485, 6) # set value of r0 to the expected output of the recursive function
+                write(5489, 21) # nop to skip call to recursive function
+                write(5490, 21) # as above
 
                 return 25734 # found from fun.rs
-        return regs[r]
+        return self.regs[r]
+
+    # write the VM state to path, see restore()
+    def save(self, path):
+        inp = self.inp.encode("utf-8")
+        ninp = len(inp)
+        if ninp % 2:
+            inp += b"\0"
+        words = array("H", list(self.mem) + self.regs + self.stack)
+        if sys.byteorder != "little":
+            words.byteswap()
+
+        with open(path, "wb") as f:
+            f.write(snapshot_header.pack(snapshot_magic, self.ip, len(self.stack), ninp))
+            f.write(words.tobytes())
+            f.write(inp)
+
+    # run until halt. handlers are called with ip and the operands of the
+    # decoded instruction there, execute it and return the next ip, or None
+    # to halt
+    def run(self):
+        table = self.decoder.table
+        handlers = self.handlers
+        trace = self.trace
+        ip = self.ip
+
+        try:
+            if trace:
+                while ip is not None:
+                    op, args, _ = table[ip]
+                    trace(ip, op, args, self.regs)
+                    ip = handlers[op](ip, *args)
+            else:
+                while ip is not None:
+                    op, args, _ = table[ip]
+                    ip = handlers[op](ip, *args)
+        finally:
+            # ip is that of the instruction that raised, e.g. when input runs
+            # out, so that the VM can be resumed
+            if ip is not None:
+                self.ip = ip
+
+    def halt(self, ip):
+        return None
+
+    def set(self, ip, a, b): # set: 1 a b, set register <a> to the value of <b>
+        if b > 32767:
+            b = self.regs[b - 32768] if b != 32775 else self.read(b, ip)
+        self.regs[a - 32768] = b
+        return ip + 3
+
+    def push(self, ip, a): # push: 2 a, push <a> onto the stack
+        if a > 32767:
+            a = self.regs[a - 32768] if a != 32775 else self.read(a, ip)
+        self.stack.append(a)
+        return ip + 2
+
+    def pop(self, ip, a): # pop: 3 a, remove the top element from the stack and write it into <a>; empty stack = error
+        self.regs[a - 32768] = self.stack.pop()
+        return ip + 2
+
+    # operands b and c of three operand ops
+    def bc(self, ip, b, c):
+        if b > 32767:
+            b = self.regs[b - 32768] if b != 32775 else self.read(b, ip)
+        if c > 32767:
+            c = self.regs[c - 32768] if c != 32775 else self.read(c, ip)
+        return b, c
+
+    def eq(self, ip, a, b, c): # eq: 4 a b c, set <a> to 1 if <b> is equal to <c>; set it to 0 otherwise
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = int(b == c)
+        return ip + 4
+
+    def gt(self, ip, a, b, c): # gt: 5 a b c, set <a> to 1 if <b> is greater than <c>; set it to 0 otherwise
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = int(b > c)
+        return ip + 4
+
+    def jmp(self, ip, a): # jmp: 6 a, jump to <a>
+        return self.read(a, ip)
+
+    def jt(self, ip, a, b): # jt: 7 a b, if <a> is nonzero, jump to <b>
+        if a > 32767:
+            a = self.regs[a - 32768] if a != 32775 else self.read(a, ip)
+        if a != 0:
+            return self.read(b, ip)
+        return ip + 3
+
+    def jf(self, ip, a, b): # jf: 8 a b, if <a> is zero, jump to <b>
+        if a > 32767:
+            a = self.regs[a - 32768] if a != 32775 else self.read(a, ip)
+        if a == 0:
+            return self.read(b, ip)
+        return ip + 3
+
+    def add(self, ip, a, b, c): # add: 9 a b c, assign into <a> the sum of <b> and <c> (modulo 32768)
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = (b + c) % 32768
+        return ip + 4
+
+    def mult(self, ip, a, b, c): # mult: 10 a b c, store into <a> the product of <b> and <c> (modulo 32768)
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = (b * c) % 32768
+        return ip + 4
+
+    def mod(self, ip, a, b, c): # mod: 11 a b c, store into <a> the remainder of <b> divided by <c>
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = b % c
+        return ip + 4
+
+    def and_(self, ip, a, b, c): # and: 12 a b c, stores into <a> the bitwise and of <b> and <c>
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = b & c
+        return ip + 4
+
+    def or_(self, ip, a, b, c): # or: 13 a b c, stores into <a> the bitwise or of <b> and <c>
+        b, c = self.bc(ip, b, c)
+        self.regs[a - 32768] = b | c
+        return ip + 4
+
+    def not_(self, ip, a, b): # not: 14 a b, stores 15-bit bitwise inverse of <b> in <a>
+        if b > 32767:
+            b = self.regs[b - 32768] if b != 32775 else self.read(b, ip)
+        self.regs[a - 32768] = ~b & 0b111111111111111
+        return ip + 3
+
+    def rmem(self, ip, a, b): # rmem: 15 a b, read memory at address <b> and write it to <a>
+        if b > 32767:
+            b = self.regs[b - 32768] if b != 32775 else self.read(b, ip)
+        self.regs[a - 32768] = self.mem[b]
+        return ip + 3
+
+    def wmem(self, ip, a, b): # wmem: 16 a b, write the value from <b> into memory at address <a>
+        self.decoder.write(self.read(a, ip), self.read(b, ip))
+        return ip + 3
+
+    def call(self, ip, a): # call: 17 a, write the address of the next instruction to the stack and jump to <a>
+        self.stack.append(ip + 2)
+        return self.read(a, ip)
+
+    def ret(self, ip): # ret: 18, remove the top element from the stack and jump to it; empty stack = halt
+        if not self.stack:
+            return None
+        return self.stack.pop()
+
+    def out(self, ip, a): # out: 19 a, write the character represented by ascii code <a> to the terminal
+        print(chr(self.read(a, ip)), end='')
+        return ip + 2
+
+    def in_(self, ip, a): # in: 20 a, read a character from the terminal and write its ascii code to <a>; it can be assumed that once input starts, it will continue until a newline is encountered; this means that you can safely read whole lines from the keyboard and trust that they will be fully read
+        # we're out of prepared input, switch to manual input mode
+        if not self.inp:
+            self.inp = input()
+            self.inp += "\n"
 
-def reg(x):
-    return x - 32768
+        # !save <path> lines save a snapshot, resuming at this instruction
+        # with the rest of the input
+        while self.inp.startswith("!save "):
+            line, _, self.inp = self.inp.partition("\n")
+            self.ip = ip
+            self.save(line.split()[1])
+            if not self.inp:
+                return ip
+
+        self.regs[a - 32768] = ord(self.inp[0])
+        self.inp = self.inp[1:]
+
+        return ip + 2
+
+    def noop(self, ip): # noop: 21
+        return ip + 1
+
+    def invalid(self, ip):
+        assert False, "Unknown opcode: %s" % self.mem[ip]
 
 # walk around the cake and pick up items
 inp = """
@@ -100,6 +476,7 @@ use corroded coin
 
 # use teleporter, this will trigger the patching of registry/memory above
 inp += """
+!save teleporter.snap
 north
 take teleporter
 use teleporter
@@ -132,6 +509,7 @@ north
 # 22 + 4 - 11 * 4 - 18 - 11 - 1
 
 inp += """
+!save orb.snap
 take orb
 north
 east
@@ -150,288 +528,43 @@ take mirror
 use mirror
 """
 
-ff = open("trace.txt", "w")
-
-def trace(ip, op, reg, *args):
-    s = str(ip) + ": " + op + " "
-    if reg:
-        s += "$%s, " % reg
-
-    s += ", ".join(map(str, args))
-    ff.write(s + "\n")
-
-def disassemble():
+def disassemble(mem):
+    table = Decoder(mem).table
     with open("disassembly.txt", "w") as f:
-
-        def p(ip, op, reg, *args):
-            s = "%s: %s " % (ip, op)
-            if reg:
-                r = reg - 32768
-                s += "r%s, " % r
-
-            def rr(x):
-                if x >= 32768:
-                    return "r%s" % (x - 32768)
-                else:
-                    return str(x)
-
-            s += ", ".join(map(rr, args))
-            f.write(s + "\n")
-
         ip = 0
-        while ip + 1 < len(mem):
-            op = mem[ip]
-
-            if op == 0:
-                p(ip, "halt", None)
-                ip += 1
-            elif op == 1:
-                p(ip, "set", mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 2:
-                p(ip, "push", None, mem[ip+1])
-                ip += 2
-            elif op == 3:
-                p(ip, "pop", mem[ip+1])
-                ip += 2
-            elif op == 4 or op == 5:
-                oo = "eq" if op == 4 else "gt"
-                p(ip, oo, mem[ip+1], mem[ip+2], mem[ip+3])
-                ip += 4
-            elif op == 6:
-                p(ip, "jmp", None, mem[ip+1])
-                ip += 2
-            elif op == 7:
-                p(ip, "jt", None, mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 8:
-                p(ip, "jf", None, mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 9 or op == 10 or op == 11:
-                if op == 9:
-                    oo = "add"
-                elif op == 10:
-                    oo = "mul"
-                elif op == 11:
-                    oo = "mod"
-
-                p(ip, oo, mem[ip+1], mem[ip+2], mem[ip+3])
-                ip += 4
-            elif op == 12 or op == 13:
-                if op == 12:
-                    oo = "and"
-                elif op == 13:
-                    oo = "or"
-
-                p(ip, oo, mem[ip+1], mem[ip+2], mem[ip+3])
-                ip += 4
-            elif op == 14:
-                p(ip, "not", mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 15:
-                p(ip, "rmem", mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 16:
-                p(ip, "wmem", None, mem[ip+1], mem[ip+2])
-                ip += 3
-            elif op == 17:
-                p(ip, "call", None, mem[ip+1])
-                ip += 2
-            elif op == 18:
-                p(ip, "ret", None)
-                ip += 1
-            elif op == 19:
-                p(ip, "out", None, mem[ip+1])
-                ip += 2
-            elif op == 20:
-                p(ip, "in", mem[ip+1])
-                ip += 2
-            elif op == 21:
-                ip += 1
-            else:
+        while ip < len(table):
+            op, args, _ = table[ip]
+            if op == INVALID:
                 # some unknown data, skip
                 ip += 1
+                continue
+            if op != 21:
+                f.write(format_instr(ip, op, args) + "\n")
+            ip += 1 + len(args)
+
+# python3 vm.py [ring|trace] [snapshot]
+# ring keeps the last instructions, and writes them to trace.txt on exit.
+# trace writes all instructions to trace.txt
+# with a snapshot, e.g. teleporter.snap saved by the walkthrough, the run
+# resumes from there instead of starting over
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    mode = args.pop(0) if args and args[0] in ("ring", "trace") else None
+    if mode == "ring":
+        tracer = RingTrace()
+    elif mode == "trace":
+        tracer = FileTrace("trace.txt")
+    else:
+        tracer = None
 
-
-ip = 0
-while True:
-    op = mem[ip]
-
-    if op == 0:  # halt
-        break
-    elif op == 1:  # set: 1 a b, set register <a> to the value of <b>
-        a = reg(mem[ip + 1])
-        b = read(mem[ip + 2])
-
-        trace(ip, "set", a, b)
-
-        regs[a] = b
-        ip += 3
-    elif op == 2: # push: 2 a, push <a> onto the stack
-        a = read(mem[ip + 1])
-
-        trace(ip, "push", None, a)
-
-        stack.append(a)
-
-        ip += 2
-    elif op == 3: # pop: 3 a, remove the top element from the stack and write it into <a>; empty stack = error
-        a = reg(mem[ip + 1])
-
-        trace(ip, "pop", a)
-
-        x = stack.pop()
-        regs[a] = x
-
-        ip += 2
-    elif op == 4 or op == 5:
-        # eq: 4 a b c, set <a> to 1 if <b> is equal to <c>; set it to 0 otherwise
-        # gt: 5 a b c, set <a> to 1 if <b> is greater than <c>; set it to 0 otherwise
-
-        a = reg(mem[ip + 1])
-        b = read(mem[ip + 2])
-        c = read(mem[ip + 3])
-
-        if op == 4:
-            oo = "eq"
-        else:
-            oo = "gt"
-
-        trace(ip, oo, a, b, c)
-
-        if op == 4 and b == c:
-            regs[a] = 1
-        elif op == 5 and b > c:
-            regs[a] = 1
-        else:
-            regs[a] = 0
-
-        ip += 4
-    elif op == 6: # jmp, jump to <a>
-        a = read(mem[ip + 1])
-
-        trace(ip, "jmp", None, a)
-
-        ip = a
-    elif op == 7 or op == 8:
-        # jt, if <a> is nonzero, jump to <b>
-        # jf: 8 a b, if <a> is zero, jump to <b>
-
-        a = read(mem[ip + 1])
-        b = read(mem[ip + 2])
-
-        oo = "jt" if op == 7 else "jf"
-
-        trace(ip, oo, None, a, b)
-
-        if op == 7 and a != 0:
-            ip = b
-        elif op == 8 and a == 0:
-            ip = b
-        else:
-            ip += 3
-    elif op == 9 or op == 10 or op == 11:
-        # add: 9 a b c, assign into <a> the sum of <b> and <c> (modulo 32768)
-        # mult: 10 a b c, store into <a> the product of <b> and <c> (modulo 32768)
-        # mod: 11 a b c, store into <a> the remainder of <b> divided by <c>
-
-        a = reg(mem[ip + 1])
-        b = read(mem[ip + 2])
-        c = read(mem[ip + 3])
-
-        if op == 9:
-            oo = "add"
-            x = (b + c) % 32768
-        elif op == 10:
-            oo = "mul"
-            x = (b * c) % 32768
-        elif op == 11:
-            oo = "mod"
-            x = b % c
-
-        trace(ip, oo, a, b, c)
-
-        regs[a] = x
-        ip += 4
-    elif op == 12 or op == 13:
-        # and: 12 a b c, stores into <a> the bitwise and of <b> and <c>
-        # or: 13 a b c, stores into <a> the bitwise or of <b> and <c>
-
-        a = reg(mem[ip + 1])
-        b = read(mem[ip + 2])
-        c = read(mem[ip + 3])
-
-        if op == 12:
-            oo = "and"
-            x = b & c
-        elif op == 13:
-            oo = "or"
-            x = b | c
-
-        trace(ip, oo, a, b, c)
-
-        regs[a] = x
-
-        ip += 4
-    elif op == 14: # not: 14 a b, stores 15-bit bitwise inverse of <b> in <a>
-        a = reg(mem[ip + 1])
-        b = read(mem[ip + 2])
-
-        trace(ip, "not", a, b)
-
-        x = ~b
-        x = x & 0b111111111111111
-
-        regs[a] = x
-
-        ip += 3
-    elif op == 15: # rmem: 15 a b, read memory at address <b> and write it to <a>
-        a = reg(mem[ip + 1])
-        b = mem[read(mem[ip + 2])]
-
-        trace(ip, "rmem", a, b)
-
-        regs[a] = b
-
-        ip += 3
-    elif op == 16: # wmem: 16 a b, write the value from <b> into memory at address <a>
-        a = read(mem[ip + 1])
-        b = read(mem[ip + 2])
-
-        trace(ip, "wmem", None, a, b)
-
-        mem[a] = b
-
-        ip += 3
-    elif op == 17: # call: 17 a, write the address of the next instruction to the stack and jump to <a>
-        a = read(mem[ip + 1])
-
-        trace(ip, "call", None, a)
-
-        stack.append(ip+2)
-
-        ip = a
-    elif op == 18: # ret: 18, remove the top element from the stack and jump to it; empty stack = halt
-        trace(ip, "ret", None)
-
-        ip = stack.pop()
-    elif op == 19:
-        a = read(mem[ip + 1])
-        print(chr(a), end='')
-        ip += 2
-    elif op == 20: # in: 20 a, read a character from the terminal and write its ascii code to <a>; it can be assumed that once input starts, it will continue until a newline is encountered; this means that you can safely read whole lines from the keyboard and trust that they will be fully read
-        a = reg(mem[ip + 1])
-
-        # we're out of prepared input, switch to manual input mode
-        if not inp:
-            inp = input()
-            inp += "\n"
-
-        regs[a] = ord(inp[0])
-        inp = inp[1:]
-
-        ip += 2
-    elif op == 21:  # noop
-        ip += 1
+    if args:
+        vm = restore(args[0], tracer)
     else:
-        assert False, "Unknown opcode: %s" % op
\ No newline at end of file
+        vm = VM(load("challenge.bin"), inp, tracer)
+    try:
+        vm.run()
+    finally:
+        if mode == "ring":
+            tracer.dump("trace.txt")
+        elif tracer:
+            tracer.close()
@@ -1,10 +1,14 @@
-from collections import deque, defaultdict
+import atexit
+import shelve
+from array import array
+from collections import deque, defaultdict, OrderedDict
 from copy import deepcopy
-from heapq import heappush, heappop
+from heapq import heapify, heappush, heappop
 from re import findall
-from itertools import chain
+from itertools import chain, count
 from functools import reduce
-from math import gcd, prod
+from hashlib import sha256
+from math import gcd, prod, isqrt
 
 def flatmap(f, items):
     return list(chain.from_iterable(map(f, items)))
@@ -119,65 +123,160 @@ def exhaustive_bfs(graph, start):
         level += 1
     return levels, parent
 
+# The searches below keep one parent per node, and only build the path to
+# the node they end up at. with distance, they keep the distance to each
+# node instead, and return that rather than a path
+
+# path from start to node, following parents
+def unwind(parent, start, node):
+    path = [node]
+    while node != start:
+        node = parent[node]
+        path.append(node)
+    path.reverse()
+    return path
+
 # graph is dict of node -> neighbours
 # end is predicate function
-# returns path from start to end
-def bfs(graph, start, end):
-    q = deque([[start]])
-    seen = set()
+# returns path from start to end, or with distance, its length
+def bfs(graph, start, end, distance=False):
+    q = deque([start])
+    # node -> parent, or distance from start
+    seen = {start: 0 if distance else None}
 
     while q:
-        path = q.popleft()
-        v = path[-1]
+        v = q.popleft()
         for n in graph[v]:
-            p = path + [n]
             if end(n):
-                return p
+                return seen[v] + 1 if distance else unwind(seen, start, v) + [n]
             if n not in seen:
-                q.append(p)
-                seen.add(n)
+                seen[n] = seen[v] + 1 if distance else v
+                q.append(n)
 
 # return all paths between start and end
 # graph is dict of node -> neighbours
 # end is predicate function
-# returns list of paths from start to end
-def bfs_all_paths(graph, start, end, cyclic=False):
-    q = deque([[start]])
+# returns list of paths from start to end, or with distance, their lengths
+def bfs_all_paths(graph, start, end, cyclic=False, distance=False):
+    # paths are linked lists of (node, rest of the path, length), sharing
+    # their beginnings
+    q = deque([(start, None, 0)])
     paths = []
 
+    def nodes(path):
+        while path:
+            yield path[0]
+            path = path[1]
+
     while q:
         path = q.popleft()
-        v = path[-1]
+        v, _, length = path
         for n in graph[v]:
-            if cyclic and n in path:
+            if cyclic and n in nodes(path):
                 continue
 
-            p = path + [n]
+            p = (n, path, length + 1)
             if end(n):
-                paths.append(p)
+                paths.append(length + 1 if distance else list(nodes(p))[::-1])
             else:
                 q.append(p)
     return paths
 
-# give topological order of graph, starting at "start"
-# graph is dict of node -> neighbours
-# returns a list of nodes in topological order
-def top_sort(graph, start):
+# the nodes reachable from start, or all nodes in graph, and the number of
+# edges into each from the others. graph is dict of node -> nodes after it
+def indegrees(graph, start=None):
+    if start is None:
+        nodes = set(graph) | set(chain.from_iterable(graph.values()))
+    else:
+        nodes = set([start])
+        stack = [start]
+        while stack:
+            for n in graph.get(stack.pop(), ()):
+                if n not in nodes:
+                    nodes.add(n)
+                    stack.append(n)
+
+    indeg = dict.fromkeys(nodes, 0)
+    for node in nodes:
+        for n in graph.get(node, ()):
+            indeg[n] += 1
+    return indeg
+
+class CycleError(Exception):
+    def __init__(self, cycle):
+        Exception.__init__(self, "cycle: %s" % " -> ".join(map(str, cycle)))
+        self.cycle = cycle
+
+# a cycle among nodes, which all have an edge into them from another of them,
+# as the ones left over by a topological sort do
+def find_cycle(graph, nodes):
+    nodes = set(nodes)
+    before = {}
+    for node in nodes:
+        for n in graph.get(node, ()):
+            if n in nodes:
+                before[n] = node
+
+    # walk backwards until a node comes round again. seen is node -> step
+    node = next(iter(nodes))
+    seen = {}
+    while node not in seen:
+        seen[node] = len(seen)
+        node = before[node]
+    return list(seen)[seen[node]:][::-1]
+
+# topological sort of the nodes reachable from start, or all nodes, where
+# graph is dict of node -> nodes after it. when more than one node could go
+# next, the least does. raises CycleError if there is no such order
+def top_sort(graph, start=None):
+    indeg = indegrees(graph, start)
+    ready = [n for n, d in indeg.items() if d == 0]
+    heapify(ready)
     result = []
-    seen = set()
-
-    def visit(node):
-        if node in graph:
-            for n in graph[node]:
-                if n not in seen:
-                    seen.add(n)
-                    visit(n)
-        result.insert(0, node) # on the return path, insert in inverse order
-
-    visit(start)
-
+    while ready:
+        node = heappop(ready)
+        result.append(node)
+        for n in graph.get(node, ()):
+            indeg[n] -= 1
+            if indeg[n] == 0:
+                heappush(ready, n)
+
+    if len(result) < len(indeg):
+        raise CycleError(find_cycle(graph, [n for n, d in indeg.items() if d]))
     return result
 
+# run the nodes of graph, as for top_sort, as tasks on a number of workers.
+# a task takes duration(task), and can start when all before it are done,
+# the least ready task first. time jumps from one finish to the next.
+# returns the time when all are done, and the tasks in the order finished
+def schedule(graph, workers, duration, start=None):
+    assert workers > 0
+    indeg = indegrees(graph, start)
+    ready = [n for n, d in indeg.items() if d == 0]
+    heapify(ready)
+    # (finish time, task)
+    running = []
+    done = []
+    time = 0
+    while ready or running:
+        while ready and len(running) < workers:
+            task = heappop(ready)
+            heappush(running, (time + duration(task), task))
+
+        # all tasks finishing now release theirs before any is started
+        time = running[0][0]
+        while running and running[0][0] == time:
+            _, task = heappop(running)
+            done.append(task)
+            for n in graph.get(task, ()):
+                indeg[n] -= 1
+                if indeg[n] == 0:
+                    heappush(ready, n)
+
+    if len(done) < len(indeg):
+        raise CycleError(find_cycle(graph, [n for n, d in indeg.items() if d]))
+    return time, done
+
 orthogonal = [(0, -1), (0, 1), (-1, 0), (1, 0)]
 adjacent = [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
 
@@ -248,25 +347,181 @@ def maze_to_graph(maze, start, is_neighbour):
                     seen.add(n)
     return g
 
-# finds a path between start and goal
-# graph is dict of node -> neighbours
-# node and neighbours are (x, y) tuples, as is start and goal
-def astar(graph, start, goal):
-    q = [(0, [start])]
-    seen = set([start])
-
+# Grid in one flat bytearray, row by row, inside a border of pad cells.
+# Cells are ints, indices into cells, and the neighbours of any cell inside
+# the border are at fixed offsets from it, so walks need no bounds checks,
+# only a pad value they stop at. Values are bytes, for grids from text, the
+# character codes.
+#
+# g = Grid.from_text(lines)
+# for i in g:
+#     n = sum(g.cells[i + d] == ord("#") for d in g.adjacent)
+class Grid:
+    def __init__(self, w, h, fill=0, pad=0):
+        self.w = w
+        self.h = h
+        self.pad = pad
+        # length of a row, with a border cell at each end
+        self.stride = s = w + 2
+        self.cells = bytearray([pad]) * (s * (h + 2))
+        if fill != pad:
+            for y in range(h):
+                self.row(y)[:] = bytes([fill]) * w
+        # offsets to neighbours, in the order of orthogonal and adjacent
+        self.orthogonal = [dx + dy * s for dx, dy in orthogonal]
+        self.adjacent = [dx + dy * s for dx, dy in adjacent]
+
+    # grid of the characters in lines, which must all be the same length
+    @classmethod
+    def from_text(cls, lines, pad=" "):
+        lines = [l.rstrip("\n").encode() for l in lines]
+        lines = [l for l in lines if l]
+        w = len(lines[0])
+        assert all(len(l) == w for l in lines)
+        g = cls(w, len(lines), pad=ord(pad))
+        p = pad.encode()
+        g.cells = bytearray(p * (w + 2) + b"".join(p + l + p for l in lines) + p * (w + 2))
+        return g
+
+    def index(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def coord(self, i):
+        y, x = divmod(i, self.stride)
+        return x - 1, y - 1
+
+    def __getitem__(self, p):
+        return self.cells[self.index(*p)]
+
+    def __setitem__(self, p, v):
+        self.cells[self.index(*p)] = v
+
+    # indices of the cells inside the border, row by row
+    def __iter__(self):
+        for y in range(self.h):
+            i = self.index(0, y)
+            yield from range(i, i + self.w)
+
+    # view of row y, without the border, writes go to the grid
+    def row(self, y):
+        i = self.index(0, y)
+        return memoryview(self.cells)[i:i + self.w]
+
+    # indices of cells with value v, a byte or a character
+    def find(self, v):
+        v = ord(v) if isinstance(v, str) else v
+        return [i for i in self if self.cells[i] == v]
+
+    # number of cells with value v, a byte or a character
+    def count(self, v):
+        v = ord(v) if isinstance(v, str) else v
+        border = 2 * (self.stride + self.h) if v == self.pad else 0
+        return self.cells.count(v) - border
+
+    def lines(self):
+        return [self.row(y).tobytes().decode() for y in range(self.h)]
+
+    def copy(self):
+        return deepcopy(self)
+
+    # the graph of moves by offsets (default orthogonal) between cells with
+    # values in passable (bytes or str), in compressed sparse row form: the
+    # neighbours of cell i are indices[indptr[i]:indptr[i + 1]]. returns
+    # (indptr, indices)
+    def to_graph(self, passable, offsets=None):
+        offsets = offsets or self.orthogonal
+        ok = bytearray(256)
+        for v in passable.encode() if isinstance(passable, str) else passable:
+            ok[v] = 1
+        # only cells inside the border have neighbours
+        assert not ok[self.pad]
+
+        cells = self.cells
+        indptr = array("l", [0])
+        indices = array("l")
+        for i, v in enumerate(cells):
+            if ok[v]:
+                indices.extend(j for j in (i + d for d in offsets) if ok[cells[j]])
+            indptr.append(len(indices))
+        return indptr, indices
+
+# distance to every node from start in a graph as from Grid.to_graph, -1
+# for those that can't be reached
+def csr_bfs(graph, start):
+    indptr, indices = graph
+    dist = array("l", [-1]) * (len(indptr) - 1)
+    dist[start] = 0
+    q = deque([start])
     while q:
-        cost, path = heappop(q)
-        c = path[-1]
-
-        if c == goal:
-            return path
-
-        for n in graph[c]:
-            if n not in seen:
-                priority = cost + 1 + manhattan(n, goal)
-                heappush(q, (priority, path + [n]))
-                seen.add(n)
+        i = q.popleft()
+        d = dist[i] + 1
+        for j in indices[indptr[i]:indptr[i + 1]]:
+            if dist[j] < 0:
+                dist[j] = d
+                q.append(j)
+    return dist
+
+# Best first search. neighbours(node) yields (node, cost) pairs. with a
+# heuristic(node), an estimate of the cost left that never overestimates,
+# this is A*, otherwise Dijkstra. Queue entries made stale by a cheaper path
+# are skipped when popped, rather than removed. Stats on the last run are
+# in expanded (nodes popped and expanded), pushed and max_queue.
+#
+# s = Search(neighbours, heuristic)
+# cost, node = s.run(start, lambda n: n == goal)
+# s.path(node)
+class Search:
+    def __init__(self, neighbours, heuristic=None):
+        self.neighbours = neighbours
+        self.heuristic = heuristic or (lambda n: 0)
+
+    # search from start until a node where goal is true is expanded, and
+    # return (cost, node), or None if there is none. without goal, search
+    # everything reachable, the cost of each node is in self.cost after
+    def run(self, start, goal=None):
+        neighbours, h = self.neighbours, self.heuristic
+        self.start = start
+        # node -> cheapest cost found, and parent on that path
+        cost = self.cost = {start: 0}
+        parent = self.parent = {start: None}
+        self.expanded = self.pushed = self.max_queue = 0
+
+        # on equal estimates, the node furthest along goes first, then the
+        # one pushed first, so that nodes needn't be comparable
+        tie = count()
+        q = [(h(start), 0, next(tie), start)]
+        while q:
+            self.max_queue = max(self.max_queue, len(q))
+            _, g, _, node = heappop(q)
+            g = -g
+            if g > cost[node]:
+                continue
+            self.expanded += 1
+
+            if goal and goal(node):
+                return g, node
+
+            for n, c in neighbours(node):
+                gn = g + c
+                if gn < cost.get(n, gn + 1):
+                    cost[n] = gn
+                    parent[n] = node
+                    heappush(q, (gn + h(n), -gn, next(tie), n))
+                    self.pushed += 1
+        return None
+
+    # path from start to node, in the last run
+    def path(self, node):
+        return unwind(self.parent, self.start, node)
+
+# shortest path on a graph of dict of node -> neighbours, all a step apart,
+# with manhattan distance as the heuristic. returns path from start to goal,
+# or with distance, its length
+def astar(graph, start, goal, distance=False):
+    s = Search(lambda n: ((x, 1) for x in graph[n]), lambda n: manhattan(n, goal))
+    found = s.run(start, lambda n: n == goal)
+    if found:
+        return found[0] if distance else s.path(goal)
 
 # returns all transpositions of a list of lists, that is, all rotations and mirrored versions
 # e.g. ["12", "34"] => [["12", "34"], ["21", "43"], ["34", "12"], ["43", "21"], ["13", "24"], ["31", "42"], ["24", "13"], ["42", "31"]]
@@ -313,20 +568,164 @@ def binary_search(lo, hi, check):
         else:
             lo = x
 
-# Simple memoize implementation, use with @Memoize
+# find the cycle in x0, f(x0), f(f(x0)), ... with Brent's algorithm, in
+# constant memory. returns (lam, mu), the length of the cycle and the index
+# of the first element in it
+def brent(f, x0):
+    power = lam = 1
+    tortoise = x0
+    hare = f(x0)
+    while tortoise != hare:
+        if power == lam:
+            tortoise = hare
+            power *= 2
+            lam = 0
+        hare = f(hare)
+        lam += 1
+
+    tortoise = hare = x0
+    for _ in range(lam):
+        hare = f(hare)
+    mu = 0
+    while tortoise != hare:
+        tortoise = f(tortoise)
+        hare = f(hare)
+        mu += 1
+    return lam, mu
+
+# Memoize, use with @Memoize, or @memoize(maxsize=..) for options.
+#
+# maxsize bounds the number of results kept, the least recently used are
+# evicted first. key(*args, **kwargs) makes the cache key, for arguments
+# that aren't hashable. with path, results are also kept in a shelve file
+# there, keyed by a hash of the repr of the function name and key, and
+# survive between runs. that only works for keys of plain values, such as
+# numbers, strings and tuples of them, whose repr is the same in every
+# run. for anything else, pass a key that makes one. Counts of hits,
+# misses and evictions are kept, disk hits are counted both as hits and
+# disk_hits
 class Memoize:
-    def __init__(self, f):
+    def __init__(self, f, maxsize=None, key=None, path=None):
         self.f = f
-        self.memo = {}
-
-    def __call__(self, *args):
-        if not args in self.memo:
-            self.memo[args] = self.f(*args)
-        #Warning: You may wish to do a deepcopy here if returning objects
-        return self.memo[args]
+        self.maxsize = maxsize
+        self.key = key
+        self.path = path
+        self.disk = None
+        self.memo = OrderedDict()
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+
+    def __call__(self, *args, **kwargs):
+        if self.key:
+            k = self.key(*args, **kwargs)
+        else:
+            k = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        memo = self.memo
+        if k in memo:
+            self.hits += 1
+            if self.maxsize is not None:
+                memo.move_to_end(k)
+            #Warning: You may wish to do a deepcopy here if returning objects
+            return memo[k]
+
+        if self.path:
+            h = self.digest(k)
+            disk = self.open()
+            if h in disk:
+                self.hits += 1
+                self.disk_hits += 1
+                v = disk[h]
+                self.store(k, v)
+                return v
+
+        self.misses += 1
+        v = self.f(*args, **kwargs)
+        self.store(k, v)
+        if self.path:
+            self.disk[h] = v
+        return v
+
+    def store(self, k, v):
+        memo = self.memo
+        memo[k] = v
+        if self.maxsize is not None and len(memo) > self.maxsize:
+            memo.popitem(last=False)
+            self.evictions += 1
+
+    def digest(self, k):
+        return sha256(repr((self.f.__qualname__, k)).encode()).hexdigest()
+
+    def open(self):
+        if self.disk is None:
+            self.disk = shelve.open(self.path)
+            atexit.register(self.close)
+        return self.disk
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    def __len__(self):
+        return len(self.memo)
+
+    # forget everything in memory, and on disk with disk, and reset counts
+    def clear(self, disk=False):
+        self.memo.clear()
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+        if disk and self.path:
+            self.open().clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "disk_hits": self.disk_hits, "size": len(self.memo)}
+
+def memoize(maxsize=None, key=None, path=None):
+    return lambda f: Memoize(f, maxsize, key, path)
 
 # Maths
 
+# sieve of Eratosthenes, returns a bytearray where s[x] is 1 if x is prime,
+# for x < n
+def sieve(n):
+    s = bytearray([1]) * n
+    for x in range(min(n, 2)):
+        s[x] = 0
+    for p in range(2, isqrt(max(n - 1, 0)) + 1):
+        if s[p]:
+            s[p * p::p] = bytes(len(range(p * p, n, p)))
+    return s
+
+# segmented sieve for lo <= x < hi, a segment of at most size numbers at a
+# time, so that memory doesn't depend on hi. yields (start, s) where s[i] is
+# 1 if start + i is prime
+def segmented_sieve(lo, hi, size=1 << 16):
+    small = sieve(isqrt(max(hi - 1, 0)) + 1)
+    ps = [p for p, is_prime in enumerate(small) if is_prime]
+    for start in range(lo, hi, size):
+        end = min(start + size, hi)
+        s = bytearray([1]) * (end - start)
+        for p in ps:
+            if p * p >= end:
+                break
+            first = max(p * p, (start + p - 1) // p * p)
+            s[first - start::p] = bytes(len(range(first, end, p)))
+        for x in range(start, min(end, 2)):
+            s[x - start] = 0
+        yield start, s
+
+# number of composites in the range r, e.g. range(b, c + 1, 17)
+def count_composites(r):
+    assert r.start >= 0 and r.step > 0
+    n = 0
+    if not r:
+        return n
+    for start, s in segmented_sieve(r[0], r[-1] + 1):
+        k = max(0, -(-(start - r.start) // r.step))
+        for x in range(r.start + k * r.step, start + len(s), r.step):
+            if x > 1 and not s[x - start]:
+                n += 1
+    return n
+
 # least common multiple
 def lcm(*args):
     if len(args) == 2:
@@ -1,5 +1,9 @@
 from util import *
 from collections import *
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
 
 class Misc(unittest.TestCase):
@@ -68,9 +72,36 @@ class Misc(unittest.TestCase):
         self.assertEqual(['FUEL', 'E', 'D', 'C', 'A', 'B', 'ORE'], top_sort(g, "FUEL"))
         self.assertEqual(['C', 'A', 'B', 'ORE'], top_sort(g, "C"))
 
+    def test_topsort_all(self):
+        g = {"C": ["A", "F"], "A": ["B", "D"], "B": ["E"], "D": ["E"], "F": ["E"]}
+        self.assertEqual(list("CABDFE"), top_sort(g))
+
+        # deep enough to have broken the recursive version
+        chain = {n: [n + 1] for n in range(10000)}
+        self.assertEqual(list(range(10001)), top_sort(chain, 0))
+
+    def test_topsort_cycle(self):
+        g = {"A": ["B"], "B": ["C"], "C": ["D", "B"], "D": []}
+        with self.assertRaises(CycleError) as e:
+            top_sort(g, "A")
+        self.assertEqual({"B", "C"}, set(e.exception.cycle))
+
+        # a long cycle is reported whole
+        g = {n: [n + 1] for n in range(20000)}
+        g[20000] = [1]
+        with self.assertRaises(CycleError) as e:
+            top_sort(g, 0)
+        self.assertEqual(set(range(1, 20001)), set(e.exception.cycle))
+
+    def test_schedule(self):
+        g = {"C": ["A", "F"], "A": ["B", "D"], "B": ["E"], "D": ["E"], "F": ["E"]}
+        self.assertEqual((15, list("CABFDE")), schedule(g, 2, lambda s: ord(s) - 64))
+        self.assertEqual((21, list("CABDFE")), schedule(g, 1, lambda s: ord(s) - 64))
+
     def test_bfs(self):
         g = {'A': ['ORE'], 'C': ['B', 'A'], 'B': ['ORE'], 'E': ['D', 'A'], 'D': ['C', 'A'], 'FUEL': ['E', 'A']}
         self.assertEqual(['FUEL', 'A', 'ORE'], bfs(g, "FUEL", lambda x: x == "ORE"))
+        self.assertEqual(2, bfs(g, "FUEL", lambda x: x == "ORE", distance=True))
 
     def test_bfs_all_paths(self):
         g = {'A': ['ORE'], 'C': ['B', 'A'], 'B': ['ORE'], 'E': ['D', 'A'], 'D': ['C', 'A'], 'FUEL': ['E', 'A']}
@@ -82,6 +113,11 @@ class Misc(unittest.TestCase):
             ['FUEL', 'E', 'D', 'C', 'A', 'ORE']
             ],
                 bfs_all_paths(g, "FUEL", lambda x: x == "ORE"))
+        self.assertEqual([2, 3, 4, 5, 5], bfs_all_paths(g, "FUEL", lambda x: x == "ORE", distance=True))
+
+    def test_bfs_all_paths_cyclic(self):
+        g = {1: [2, 3], 2: [1, 3], 3: [1, 2, 4]}
+        self.assertEqual([[1, 3, 4], [1, 2, 3, 4]], bfs_all_paths(g, 1, lambda x: x == 4, cyclic=True))
 
     def test_astar(self):
         maze = [[0, 0, 0, 0, 1, 0, 0, 0, 0, 0],
@@ -97,6 +133,34 @@ class Misc(unittest.TestCase):
         graph = maze_to_graph(maze, (0, 0), lambda _, __, ___, x: not x)
 
         self.assertEqual([(0, 0), (1, 1), (2, 2), (3, 3), (3, 4), (4, 5), (5, 4), (5, 3), (5, 2), (5, 1), (5, 0)], astar(graph, (0, 0), (5, 0)))
+        self.assertEqual(10, astar(graph, (0, 0), (5, 0), distance=True))
+
+    def test_search(self):
+        g = {"a": [("b", 1), ("c", 4)], "b": [("c", 1), ("d", 5)], "c": [("d", 1)], "d": []}
+        s = Search(lambda n: g[n])
+        self.assertEqual((3, "d"), s.run("a", lambda n: n == "d"))
+        self.assertEqual(["a", "b", "c", "d"], s.path("d"))
+        self.assertEqual(4, s.expanded)
+        # c and d were pushed again when cheaper, the stale entries skipped
+        self.assertEqual(5, s.pushed)
+        self.assertEqual(3, s.max_queue)
+
+        self.assertEqual(None, s.run("b", lambda n: n == "a"))
+        self.assertEqual({"b": 0, "c": 1, "d": 2}, s.cost)
+
+    def test_search_heuristic(self):
+        # open 10x10 grid, the heuristic leads straight to the goal
+        def neighbours(p):
+            for n in iter_orthogonal(*p, [[0] * 10] * 10):
+                yield n, 1
+
+        goal = (9, 9)
+        dijkstra = Search(neighbours)
+        astar = Search(neighbours, lambda p: manhattan(p, goal))
+        self.assertEqual((18, goal), dijkstra.run((0, 0), lambda p: p == goal))
+        self.assertEqual((18, goal), astar.run((0, 0), lambda p: p == goal))
+        self.assertEqual(19, len(astar.path(goal)))
+        self.assertLess(astar.expanded, dijkstra.expanded)
 
     def test_transpositions(self):
         self.assertEqual(set([("12", "34"),
@@ -128,6 +192,117 @@ class Misc(unittest.TestCase):
 
 
 
+    def test_grid(self):
+        g = Grid.from_text(["#..\n", ".#.\n"])
+        self.assertEqual((3, 2, 5), (g.w, g.h, g.stride))
+        self.assertEqual(ord("#"), g[1, 1])
+        self.assertEqual((1, 1), g.coord(g.index(1, 1)))
+        self.assertEqual([g.index(0, 0), g.index(1, 1)], g.find("#"))
+        self.assertEqual(2, g.count("#"))
+        self.assertEqual(4, g.count("."))
+
+        g[2, 0] = ord("#")
+        g.row(1)[0] = ord("#")
+        self.assertEqual(["#.#", "##."], g.lines())
+        # the border stops a walk off the edge
+        i = g.index(2, 1)
+        self.assertEqual([ord(" ")] * 2, [g.cells[i + d] for d in (g.orthogonal[1], g.orthogonal[3])])
+        self.assertEqual(6, len(list(g)))
+
+        g = Grid(2, 2, fill=1)
+        self.assertEqual(4, g.count(1))
+        self.assertEqual(0, g.count(0))
+
+    def test_grid_graph(self):
+        g = Grid.from_text(["..#", "#..", "..."], pad="#")
+        indptr, indices = graph = g.to_graph(".")
+        start = g.index(0, 0)
+        self.assertEqual([g.index(1, 0)], list(indices[indptr[start]:indptr[start + 1]]))
+        dist = csr_bfs(graph, start)
+        self.assertEqual(4, dist[g.index(2, 2)])
+        self.assertEqual(4, dist[g.index(0, 2)])
+        self.assertEqual(-1, dist[g.index(2, 0)])
+
+    def test_memoize(self):
+        calls = []
+
+        @Memoize
+        def f(x, y=0):
+            calls.append(x)
+            return x + y
+
+        self.assertEqual(3, f(1, 2))
+        self.assertEqual(3, f(1, 2))
+        self.assertEqual(5, f(1, y=4))
+        self.assertEqual([1, 1], calls)
+        self.assertEqual({"hits": 1, "misses": 2, "evictions": 0, "disk_hits": 0, "size": 2}, f.stats())
+        f.clear()
+        self.assertEqual(0, len(f))
+
+    def test_memoize_bounded(self):
+        @memoize(maxsize=2, key=lambda xs: tuple(xs))
+        def f(xs):
+            return sum(xs)
+
+        f([1])
+        f([2])
+        f([1])
+        f([3])
+        # [2] was the least recently used
+        self.assertEqual([(1,), (3,)], list(f.memo))
+        self.assertEqual(1, f.evictions)
+
+        @memoize(maxsize=10)
+        def fib(n):
+            return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+        self.assertEqual(354224848179261915075, fib(100))
+        self.assertEqual(10, len(fib))
+
+    def test_memoize_disk(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "memo")
+
+            def square(x):
+                return x * x
+
+            f = Memoize(square, path=path)
+            self.assertEqual(9, f(3))
+            f.close()
+
+            f = Memoize(square, path=path)
+            self.assertEqual(9, f(3))
+            self.assertEqual((1, 0), (f.disk_hits, f.misses))
+            f.clear(disk=True)
+            self.assertEqual(16, f(4))
+            self.assertEqual(1, f.misses)
+            f.close()
+
+    def test_memoize_disk_kwargs(self):
+        # keyword arguments key the same in any order, and in another run
+        # with a different string hash seed
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "memo")
+            src = "from util import *\n" \
+                  "def f(**kw): return sum(kw.values())\n" \
+                  "m = Memoize(f, path=%r)\n" \
+                  "m(alpha=1, beta=2, gamma=3, delta=4)\n" \
+                  "m.close()\n" % path
+            env = dict(os.environ, PYTHONHASHSEED="1")
+            subprocess.run([sys.executable, "-c", src], env=env, check=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+
+            def f(**kw):
+                return sum(kw.values())
+            # the name is part of the key
+            f.__qualname__ = "f"
+
+            m = Memoize(f, path=path)
+            self.assertEqual(10, m(delta=4, gamma=3, beta=2, alpha=1))
+            self.assertEqual(10, m(gamma=3, alpha=1, delta=4, beta=2))
+            self.assertEqual((1, 1, 0), (m.disk_hits, m.hits - m.disk_hits, m.misses))
+            m.close()
+
     def test_in_grid(self):
         grid = [[0, 0, 0], [0, 0, 0], [0, 0, 0]]
 
@@ -190,6 +365,26 @@ class Misc(unittest.TestCase):
     def test_binary_search(self):
         self.assertEqual((123455, 123456), binary_search(0, 10000000, lambda x: x >= 123456))
 
+    def test_brent(self):
+        self.assertEqual((6, 2), brent(lambda x: [1, 2, 3, 4, 5, 6, 7, 2][x], 0))
+        self.assertEqual((1, 0), brent(lambda x: x, 5))
+        self.assertEqual((4, 3), brent(lambda x: x + 1 if x < 6 else 3, 0))
+
+    def test_sieve(self):
+        s = sieve(20)
+        self.assertEqual([2, 3, 5, 7, 11, 13, 17, 19], [x for x in range(20) if s[x]])
+        self.assertEqual(bytearray(), sieve(0))
+
+    def test_segmented_sieve(self):
+        s = sieve(1000)
+        primes = [start + i for start, seg in segmented_sieve(0, 1000, 64) for i, p in enumerate(seg) if p]
+        self.assertEqual([x for x in range(1000) if s[x]], primes)
+
+    def test_count_composites(self):
+        self.assertEqual(6, count_composites(range(1, 13)))
+        self.assertEqual(2, count_composites(range(3, 30, 4)))
+        self.assertEqual(0, count_composites(range(5, 5)))
+
     def test_lcm(self):
         self.assertEqual(12, lcm(4, 6))
 